@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib import admin
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .jobs import enqueue
+from .mail import DELIVER_JOB
+from .models import Job, OutboxMessage
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'started',
+        'finished',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'subject',
+        'recipients',
+        'status',
+        'attempts',
+        'next_attempt',
+        'created',
+        'sent',
+    )
+    list_filter = ('status', 'created')
+    search_fields = ('recipients', 'subject')
+    readonly_fields = ('message', 'last_error')
+    actions = ('resend',)
+
+    def resend(self, request, queryset):
+        # Письма в статусе «Отправляется» сейчас у обработчика, их
+        # возвращаем в очередь, только если он завис дольше JOB_TIMEOUT
+        stale = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT)
+        updated = queryset.filter(
+            Q(status=OutboxMessage.DEAD)
+            | Q(status=OutboxMessage.SENDING, next_attempt__lt=stale)
+        ).update(
+            status=OutboxMessage.QUEUED,
+            attempts=0,
+            next_attempt=timezone.now()
+        )
+        transaction.on_commit(lambda: enqueue(DELIVER_JOB))
+        self.message_user(request, f'Поставлено в очередь писем: {updated}')
+    resend.short_description = 'Отправить повторно'
+
+
+admin.site.register(Job, JobAdmin)
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
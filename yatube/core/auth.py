@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+User = get_user_model()
+
+
+def _user_key(user_id):
+    return f'core:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(_user_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который берёт пользователя сессии из кэша: запрос
+    авторизованного пользователя не читает auth_user. Запись удаляется
+    при любом сохранении пользователя - смене пароля, профиля, last_login.
+
+    Пользователь, у которого есть связь из AUTH_BLOCKING_RELATIONS
+    (например, ждущее удаление), не входит и теряет открытые сессии.
+    """
+
+    def is_blocked(self, user):
+        return any(
+            hasattr(user, name) for name in settings.AUTH_BLOCKING_RELATIONS
+        )
+
+    def user_can_authenticate(self, user):
+        if not super().user_can_authenticate(user):
+            return False
+        if self.is_blocked(user):
+            # PermissionDenied останавливает перебор бэкендов: иначе
+            # следующий ModelBackend впустил бы пользователя
+            raise PermissionDenied
+        return True
+
+    def get_user(self, user_id):
+        key = _user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            # Связи читаются тем же запросом и хранятся в кэше вместе
+            # с пользователем
+            user = User._default_manager.select_related(
+                *settings.AUTH_BLOCKING_RELATIONS
+            ).filter(pk=user_id).first()
+            if user is None:
+                return None
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        if self.is_blocked(user):
+            return None
+        return user if super().user_can_authenticate(user) else None
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
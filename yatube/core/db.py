@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import connections, router
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+
+
+def _column(model, field):
+    if field == 'pk':
+        return model._meta.pk.column
+    return model._meta.get_field(field).column
+
+
+def delete_rows(model, values, field='pk', using=None, **where):
+    """
+    Удаляет строки model, у которых field входит в values, а поля
+    из where равны заданным значениям, одним DELETE: без выборки,
+    каскада и сигналов. Связанные строки и кэши - забота вызывающего.
+    """
+    values = list(values)
+    if not values:
+        return 0
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(values))
+    conditions = [f'{quote(_column(model, field))} IN ({placeholders})']
+    conditions += [f'{quote(_column(model, name))} = %s' for name in where]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} '
+            f'WHERE {" AND ".join(conditions)}',
+            values + list(where.values())
+        )
+        return cursor.rowcount
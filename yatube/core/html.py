@@ -0,0 +1,76 @@
+import codecs
+import re
+import zlib
+
+# Содержимое <pre>, <textarea>, <script>, <style> и условные комментарии IE
+# не трогаем, остальные комментарии удаляем, пробелы схлопываем до одного
+# (или до перевода строки) - для HTML вне этих тегов это равнозначно.
+MINIFY = re.compile(
+    r'(?P<keep><(?P<tag>pre|textarea|script|style)\b.*?</(?P=tag)\s*>'
+    r'|<!--\[if.*?-->)'
+    r'|(?P<comment><!--.*?-->)'
+    r'|(?P<space>\s{2,})',
+    re.S | re.I
+)
+PROTECTED_START = re.compile(r'<(?:pre|textarea|script|style)\b|<!--', re.I)
+
+
+def _replace(match):
+    if match.group('keep'):
+        return match.group('keep')
+    if match.group('comment') is not None:
+        return ''
+    return '\n' if '\n' in match.group('space') else ' '
+
+
+def minify_html(html):
+    return MINIFY.sub(_replace, html)
+
+
+def _safe_end(text):
+    """
+    Длина начала text, которое можно сжать уже сейчас: без незакрытого
+    комментария или защищённого тега и без недописанного тега в конце.
+    """
+    end = len(text)
+    tag_start = text.rfind('<')
+    if tag_start > text.rfind('>'):
+        end = tag_start
+    position = 0
+    while True:
+        start = PROTECTED_START.search(text, position, end)
+        if start is None:
+            return end
+        match = MINIFY.match(text, start.start())
+        if match is None:
+            return start.start()
+        position = match.end()
+
+
+def minify_stream(chunks, charset):
+    """Сжимает HTML по мере поступления частей, не собирая ответ целиком."""
+    decoder = codecs.getincrementaldecoder(charset)()
+    buffer = ''
+    for chunk in chunks:
+        buffer += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        end = _safe_end(buffer)
+        if end:
+            yield minify_html(buffer[:end]).encode(charset)
+            buffer = buffer[end:]
+    buffer += decoder.decode(b'', final=True)
+    if buffer:
+        yield minify_html(buffer).encode(charset)
+
+
+def gzip_stream(chunks, level=6):
+    """
+    gzip для потокового ответа. После каждой части делается Z_SYNC_FLUSH,
+    чтобы клиент получал данные сразу, а не когда заполнится буфер zlib.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,122 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router
+from django.db.models import (Avg, Count, DurationField, ExpressionWrapper, F,
+                              Min)
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+def jobs():
+    """Очередь читаем из основной базы: на реплике она может отставать."""
+    return Job.objects.using(router.db_for_write(Job))
+
+
+def enqueue(name, *args, delay=0, max_attempts=None, **kwargs):
+    """Ставит в очередь вызов функции name ('app.module.func')."""
+    return jobs().create(
+        name=name,
+        payload=json.dumps({'args': args, 'kwargs': kwargs}),
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def call(name, payload):
+    data = json.loads(payload)
+    import_string(name)(*data['args'], **data['kwargs'])
+
+
+def claim_jobs(worker, limit):
+    """
+    Забирает до limit готовых задач одним UPDATE с подзапросом:
+    строку получает только тот обработчик, чей UPDATE застал её
+    в очереди, поэтому блокировки строк не нужны.
+    """
+    now = timezone.now()
+    ready = jobs().filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('run_at').values('pk')[:limit]
+    jobs().filter(pk__in=ready, status=Job.QUEUED).update(
+        status=Job.RUNNING,
+        worker=worker,
+        started=now,
+        attempts=F('attempts') + 1,
+    )
+    return list(jobs().filter(
+        status=Job.RUNNING, worker=worker, started=now
+    ).order_by('run_at'))
+
+
+def complete(job):
+    jobs().filter(pk=job.pk).update(
+        status=Job.DONE, finished=timezone.now(), last_error=''
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(
+        settings.JOB_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_DELAY
+    ))
+
+
+def fail(job, error):
+    """Повторяет задачу с растущей задержкой, пока есть попытки."""
+    now = timezone.now()
+    if job.attempts >= job.max_attempts:
+        changes = {'status': Job.FAILED, 'finished': now}
+    else:
+        changes = {
+            'status': Job.QUEUED,
+            'run_at': now + retry_delay(job.attempts),
+        }
+    jobs().filter(pk=job.pk).update(last_error=error, **changes)
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи упавших обработчиков."""
+    stale = jobs().filter(
+        status=Job.RUNNING,
+        started__lt=timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT)
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished=timezone.now()
+    )
+    return stale.update(status=Job.QUEUED)
+
+
+def purge_done():
+    return jobs().filter(
+        status=Job.DONE,
+        finished__lt=timezone.now() - timedelta(
+            hours=settings.JOB_KEEP_DONE_HOURS
+        )
+    ).delete()[0]
+
+
+def queue_stats():
+    """
+    Глубина очереди по статусам, возраст самой старой готовой задачи
+    и среднее ожидание запуска за последний час, в секундах.
+    """
+    now = timezone.now()
+    stats = dict.fromkeys((status for status, _ in Job.STATUS_CHOICES), 0)
+    stats.update(
+        jobs().values_list('status').annotate(Count('pk')).order_by()
+    )
+    oldest = jobs().filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).aggregate(oldest=Min('run_at'))['oldest']
+    wait = jobs().filter(
+        started__gte=now - timedelta(hours=1)
+    ).aggregate(wait=Avg(ExpressionWrapper(
+        F('started') - F('run_at'), output_field=DurationField()
+    )))['wait']
+    stats['lag'] = (now - oldest).total_seconds() if oldest else 0
+    stats['wait'] = wait.total_seconds() if wait else 0
+    return stats
@@ -0,0 +1,126 @@
+import json
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import router, transaction
+from django.utils import timezone
+
+from .jobs import enqueue, jobs, retry_delay
+from .models import Job, OutboxMessage
+
+DELIVER_JOB = 'core.mail.deliver_outbox'
+
+
+def outbox():
+    return OutboxMessage.objects.using(router.db_for_write(OutboxMessage))
+
+
+def serialize(message):
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+    })
+
+
+def deserialize(data, connection):
+    return EmailMultiAlternatives(connection=connection, **json.loads(data))
+
+
+class OutboxBackend(BaseEmailBackend):
+    """
+    Вместо отправки сохраняет письма в OutboxMessage и ставит задачу
+    доставки, поэтому запрос не ждёт SMTP или диска.
+    Вложения не поддерживаются.
+    """
+
+    def send_messages(self, email_messages):
+        messages = [
+            OutboxMessage(
+                subject=message.subject,
+                recipients=', '.join(message.recipients()),
+                message=serialize(message),
+            )
+            for message in email_messages if message.recipients()
+        ]
+        if messages:
+            outbox().bulk_create(messages)
+            transaction.on_commit(lambda: enqueue(DELIVER_JOB))
+        return len(messages)
+
+
+def claim_messages(limit):
+    now = timezone.now()
+    ready = outbox().filter(
+        status=OutboxMessage.QUEUED, next_attempt__lte=now
+    ).order_by('next_attempt').values('pk')[:limit]
+    outbox().filter(pk__in=ready, status=OutboxMessage.QUEUED).update(
+        status=OutboxMessage.SENDING, next_attempt=now
+    )
+    return list(outbox().filter(
+        status=OutboxMessage.SENDING, next_attempt=now
+    ))
+
+
+def deliver_outbox():
+    """
+    Отправляет готовые письма пачками по OUTBOX_BATCH_SIZE, одно
+    соединение OUTBOX_EMAIL_BACKEND на пачку. Неотправленные письма
+    повторяются с растущей задержкой, после OUTBOX_MAX_ATTEMPTS
+    попыток остаются в статусе «Не доставлено».
+    """
+    outbox().filter(
+        status=OutboxMessage.SENDING,
+        next_attempt__lt=timezone.now() - timedelta(
+            seconds=settings.JOB_TIMEOUT
+        )
+    ).update(status=OutboxMessage.QUEUED)
+    while True:
+        batch = claim_messages(settings.OUTBOX_BATCH_SIZE)
+        if not batch:
+            break
+        with get_connection(settings.OUTBOX_EMAIL_BACKEND) as connection:
+            for message in batch:
+                try:
+                    deserialize(message.message, connection).send()
+                except Exception:
+                    defer(message, traceback.format_exc())
+                else:
+                    outbox().filter(pk=message.pk).update(
+                        status=OutboxMessage.SENT,
+                        sent=timezone.now(),
+                        attempts=message.attempts + 1,
+                        last_error=''
+                    )
+    retry = outbox().filter(status=OutboxMessage.QUEUED).order_by(
+        'next_attempt'
+    ).values_list('next_attempt', flat=True).first()
+    if retry and not jobs().filter(
+        name=DELIVER_JOB, status=Job.QUEUED
+    ).exists():
+        enqueue(DELIVER_JOB, delay=max(
+            0, (retry - timezone.now()).total_seconds()
+        ))
+
+
+def defer(message, error):
+    attempts = message.attempts + 1
+    if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        changes = {'status': OutboxMessage.DEAD}
+    else:
+        changes = {
+            'status': OutboxMessage.QUEUED,
+            'next_attempt': timezone.now() + retry_delay(attempts),
+        }
+    outbox().filter(pk=message.pk).update(
+        attempts=attempts, last_error=error, **changes
+    )
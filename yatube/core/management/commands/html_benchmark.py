@@ -0,0 +1,54 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from core.html import minify_html
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк сжатия HTML: размер страниц до и после минификации '
+        'и gzip и затраты процессора на каждый шаг.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/'])
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"страница":<24}{"исходно":>10}{"минифиц.":>10}{"gzip":>10}'
+            f'{"оба":>10}{"мин., мс":>10}{"gzip, мс":>10}'
+        )
+        client = Client()
+        for path in options['paths']:
+            # Без панели отладки: страницы как в продакшене
+            with override_settings(HTML_MINIFY=False, DEBUG=False):
+                response = client.get(path)
+            if response.status_code != 200:
+                self.stderr.write(f'{path}: {response.status_code}')
+                continue
+            html = response.content.decode(response.charset)
+            minified = minify_html(html).encode(response.charset)
+            minify_ms = self.timeit(minify_html, html, options['repeat'])
+            gzip_ms = self.timeit(
+                self.gzip, minified, options['repeat']
+            )
+            self.stdout.write(
+                f'{path:<24}{len(response.content):>10}{len(minified):>10}'
+                f'{len(self.gzip(response.content)):>10}'
+                f'{len(self.gzip(minified)):>10}'
+                f'{minify_ms:>10.2f}{gzip_ms:>10.2f}'
+            )
+
+    def timeit(self, func, argument, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(argument)
+        return (time.perf_counter() - start) * 1000 / repeat
+
+    def gzip(self, content):
+        # Тот же уровень, что у GZipMiddleware
+        return gzip.compress(content, compresslevel=6)
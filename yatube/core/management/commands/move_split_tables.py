@@ -0,0 +1,43 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит строки таблиц из settings.DATABASE_TABLE_ROUTES '
+        'из основной базы в их отдельные базы пачками. '
+        'Перед запуском: python manage.py migrate --database=<alias>.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_TABLE_ROUTES:
+            raise CommandError(
+                'Разделение таблиц не включено: задайте переменную DB_SPLIT.'
+            )
+        for label, alias in settings.DATABASE_TABLE_ROUTES.items():
+            model = apps.get_model(label)
+            moved = self.move(model, alias, options['batch_size'])
+            self.stdout.write(f'{label}: перенесено {moved} строк в {alias}')
+
+    def move(self, model, alias, batch_size):
+        source = model._base_manager.using(DEFAULT_DB_ALIAS).order_by('pk')
+        moved = 0
+        while True:
+            batch = list(source[:batch_size])
+            if not batch:
+                return moved
+            # Общей транзакции у двух баз нет. Если команду прервали между
+            # вставкой и удалением, повтор вставит ту же пачку ещё раз:
+            # уже перенесённые строки пропускаются, а не падают на pk
+            with transaction.atomic(using=alias):
+                model._base_manager.using(alias).bulk_create(
+                    batch, ignore_conflicts=True
+                )
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                source.filter(pk__in=[obj.pk for obj in batch]).delete()
+            moved += len(batch)
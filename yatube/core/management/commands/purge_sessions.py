@@ -0,0 +1,33 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет истёкшие сессии из базы пачками, не держа долго '
+        'блокировку на запись, в отличие от clearsessions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, 'get_model_class'):
+            self.stdout.write('Сессии не хранятся в базе, удалять нечего.')
+            return
+        model = store.get_model_class()
+        expired = model.objects.filter(expire_date__lt=timezone.now())
+        deleted = 0
+        while True:
+            batch = list(expired.values_list(
+                'pk', flat=True
+            )[:options['batch_size']])
+            if not batch:
+                break
+            model.objects.filter(pk__in=batch).delete()
+            deleted += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Удалено сессий: {deleted}'))
@@ -0,0 +1,114 @@
+import logging
+import os
+import socket
+import time
+import traceback
+from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor,
+                                as_completed)
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import (call, claim_jobs, complete, fail, purge_done,
+                       queue_stats, requeue_stale)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди Job пачками в пуле потоков '
+        'или процессов. С --concurrency 1 задачи выполняются в основном '
+        'потоке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread'
+        )
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.'
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Показать состояние очереди и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.write_stats()
+            return
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        executor = None
+        if options['concurrency'] > 1:
+            if options['pool'] == 'process':
+                # Дочерние процессы не должны делить соединения с родителем
+                connections.close_all()
+                executor = ProcessPoolExecutor(options['concurrency'])
+            else:
+                executor = ThreadPoolExecutor(options['concurrency'])
+        processed = 0
+        try:
+            while True:
+                requeue_stale()
+                batch = claim_jobs(worker, options['batch_size'])
+                if batch:
+                    self.run_batch(batch, executor)
+                    processed += len(batch)
+                    continue
+                purge_done()
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        finally:
+            if executor:
+                executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {processed}'
+        ))
+
+    def run_batch(self, batch, executor):
+        if executor is None:
+            for job in batch:
+                try:
+                    call(job.name, job.payload)
+                except Exception:
+                    self.finish(job, traceback.format_exc())
+                else:
+                    self.finish(job)
+            return
+        futures = {
+            executor.submit(call, job.name, job.payload): job
+            for job in batch
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception:
+                self.finish(futures[future], traceback.format_exc())
+            else:
+                self.finish(futures[future])
+
+    def finish(self, job, error=None):
+        if error is None:
+            complete(job)
+            logger.debug('Задача %s выполнена', job)
+        else:
+            fail(job, error)
+            logger.warning('Задача %s завершилась ошибкой:\n%s', job, error)
+
+    def write_stats(self):
+        stats = queue_stats()
+        self.stdout.write(
+            'В очереди: {queued}, выполняется: {running}, '
+            'выполнено: {done}, с ошибкой: {failed}\n'
+            'Ожидает дольше всех: {lag:.1f} с, '
+            'среднее ожидание за час: {wait:.1f} с'.format(**stats)
+        )
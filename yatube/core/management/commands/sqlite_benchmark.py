@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas
+
+PROFILES = {
+    'default': {},
+    'production': settings.SQLITE_PRAGMAS,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Многопоточный бенчмарк чтения/записи SQLite: сравнивает '
+        'стандартный профиль соединения с settings.SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument(
+            '--timeout', type=float, default=1,
+            help='Таймаут ожидания блокировки в драйвере, секунды.'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"профиль":<12}{"чтений/с":>12}{"записей/с":>12}'
+            f'{"locked":>10}'
+        )
+        for name, pragmas in PROFILES.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.prepare(path, pragmas, options['rows'])
+                reads, writes, errors = self.run(path, pragmas, options)
+            seconds = options['seconds']
+            self.stdout.write(
+                f'{name:<12}{reads / seconds:>12.0f}'
+                f'{writes / seconds:>12.0f}{errors:>10}'
+            )
+
+    def connect(self, path, pragmas, timeout):
+        connection = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None
+        )
+        apply_pragmas(connection.cursor(), pragmas)
+        return connection
+
+    def prepare(self, path, pragmas, rows):
+        connection = self.connect(path, pragmas, timeout=5)
+        connection.execute(
+            'CREATE TABLE comment (id INTEGER PRIMARY KEY, '
+            'post_id INTEGER NOT NULL, text TEXT NOT NULL)'
+        )
+        connection.execute('CREATE INDEX comment_post ON comment (post_id)')
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO comment (post_id, text) VALUES (?, ?)',
+            ((i % 100, 'x' * 200) for i in range(rows))
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run(self, path, pragmas, options):
+        deadline = time.monotonic() + options['seconds']
+        counters = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker(write):
+            connection = self.connect(path, pragmas, options['timeout'])
+            done = errors = 0
+            post_id = 0
+            while time.monotonic() < deadline:
+                post_id = (post_id + 1) % 100
+                try:
+                    if write:
+                        connection.execute(
+                            'INSERT INTO comment (post_id, text) '
+                            'VALUES (?, ?)', (post_id, 'y' * 200)
+                        )
+                    else:
+                        connection.execute(
+                            'SELECT id, text FROM comment WHERE post_id = ? '
+                            'ORDER BY id DESC LIMIT 10', (post_id,)
+                        ).fetchall()
+                    done += 1
+                except sqlite3.OperationalError:
+                    errors += 1
+            connection.close()
+            with lock:
+                counters['writes' if write else 'reads'] += done
+                counters['errors'] += errors
+
+        threads = [
+            threading.Thread(target=worker, args=(False,))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=(True,))
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counters['reads'], counters['writes'], counters['errors']
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание SQLite: checkpoint WAL, ANALYZE и VACUUM. '
+        'Без флагов выполняет все три шага; VACUUM - только если доля '
+        'свободных страниц больше --vacuum-threshold. '
+        'Рассчитана на запуск по cron, например раз в час.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--checkpoint', nargs='?', const='TRUNCATE',
+            choices=CHECKPOINT_MODES,
+            help='Перенести WAL в основной файл (по умолчанию TRUNCATE).'
+        )
+        parser.add_argument('--analyze', action='store_true')
+        parser.add_argument('--vacuum', action='store_true')
+        parser.add_argument(
+            '--vacuum-threshold', type=float, default=0.2,
+            help='Минимальная доля свободных страниц для VACUUM.'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Выполнить VACUUM без проверки порога.'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        run_all = not (
+            options['checkpoint'] or options['analyze'] or options['vacuum']
+        )
+        with connection.cursor() as cursor:
+            if run_all or options['checkpoint']:
+                self.checkpoint(cursor, options['checkpoint'] or 'TRUNCATE')
+            if run_all or options['analyze']:
+                cursor.execute('ANALYZE')
+                self.stdout.write('ANALYZE выполнен')
+            if run_all or options['vacuum']:
+                self.vacuum(
+                    cursor, options['vacuum_threshold'], options['force']
+                )
+
+    def checkpoint(self, cursor, mode):
+        cursor.execute(f'PRAGMA wal_checkpoint({mode})')
+        busy, log, checkpointed = cursor.fetchone()
+        self.stdout.write(
+            f'checkpoint {mode}: страниц в WAL {log}, '
+            f'перенесено {checkpointed}, busy={busy}'
+        )
+
+    def vacuum(self, cursor, threshold, force):
+        cursor.execute('PRAGMA page_count')
+        pages = cursor.fetchone()[0]
+        cursor.execute('PRAGMA freelist_count')
+        free = cursor.fetchone()[0]
+        ratio = free / pages if pages else 0
+        if not force and ratio < threshold:
+            self.stdout.write(
+                f'VACUUM пропущен: свободно {ratio:.1%} страниц'
+            )
+            return
+        cursor.execute('VACUUM')
+        self.stdout.write(f'VACUUM выполнен: освобождено {free} страниц')
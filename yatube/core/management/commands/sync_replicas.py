@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-базу в файлы реплик '
+        '(settings.DATABASE_REPLICAS) через backup API.'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте переменную DB_REPLICAS.'
+            )
+        primary = connections['default'].settings_dict['NAME']
+        source = sqlite3.connect(primary)
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                connections[alias].close()
+                name = connections[alias].settings_dict['NAME']
+                target = sqlite3.connect(name)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'{primary} -> {name}')
+        finally:
+            source.close()
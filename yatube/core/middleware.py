@@ -0,0 +1,130 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware, re_accepts_gzip
+from django.templatetags.static import static
+from django.utils.cache import patch_vary_headers
+
+from .html import gzip_stream, minify_html, minify_stream
+from .routers import has_written, pin_to_primary, track_writes, unpin
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json',
+                      'image/svg+xml')
+
+
+class ReplicaPinMiddleware:
+    """
+    После записи в базу клиент на REPLICA_PIN_SECONDS читает только
+    из основной базы, чтобы видеть собственные изменения
+    до того, как они дойдут до реплик.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.COOKIES.get(settings.REPLICA_PIN_COOKIE):
+            pin_to_primary()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    if alias not in settings.DATABASE_REPLICAS:
+                        stack.enter_context(
+                            connections[alias].execute_wrapper(track_writes)
+                        )
+                response = self.get_response(request)
+            if has_written():
+                response.set_cookie(
+                    settings.REPLICA_PIN_COOKIE,
+                    '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+        finally:
+            unpin()
+        return response
+
+
+class PreloadLinkMiddleware:
+    """
+    Заголовок Link для HTML-страниц: браузер начинает грузить
+    критичный CSS из PRELOAD_STATIC, ещё не разобрав <head>.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (settings.PRELOAD_STATIC
+                and response.get('Content-Type', '').startswith('text/html')):
+            links = [
+                f'<{static(path)}>; rel=preload; as={kind}'
+                for path, kind in settings.PRELOAD_STATIC
+            ]
+            if response.has_header('Link'):
+                links.insert(0, response['Link'])
+            response['Link'] = ', '.join(links)
+        return response
+
+
+class HtmlMinifyMiddleware:
+    """
+    Удаляет из HTML комментарии и лишние пробелы (core.html.minify_html).
+    Потоковые ответы сжимаются по частям, без буферизации.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (not settings.HTML_MINIFY
+                or not response.get('Content-Type', '').startswith('text/html')
+                or response.has_header('Content-Encoding')):
+            return response
+        if response.streaming:
+            response.streaming_content = minify_stream(
+                response.streaming_content, response.charset
+            )
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            response.content = minify_html(
+                response.content.decode(response.charset)
+            )
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = str(len(response.content))
+        return response
+
+
+class StreamingGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware, который отдаёт потоковый ответ частями по мере
+    генерации: стандартный копит данные в буфере zlib. Картинки и другие
+    уже сжатые форматы не трогает.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming:
+            return super().process_response(request, response)
+        if response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not re_accepts_gzip.search(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        ):
+            return response
+        response.streaming_content = gzip_stream(response.streaming_content)
+        if response.has_header('Content-Length'):
+            del response['Content-Length']
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'gzip'
+        return response
@@ -0,0 +1,73 @@
+"""
+Двухуровневый кэш редко меняющихся объектов: ограниченный LRU в памяти
+процесса перед общим кэшем. В общем кэше у каждого ключа есть версия,
+локальная копия годится, пока её версия совпадает с общей. Сброс
+в одном процессе виден остальным, только если общий кэш действительно
+общий (CACHES с memcached или Redis), а не память процесса.
+"""
+import threading
+from collections import OrderedDict
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+class TwoTierCache:
+    """
+    Объекты из loader(key) по ключу. Чтение из памяти процесса стоит
+    одного обращения к общему кэшу за версией, без распаковки объекта
+    и без запроса к базе. Объекты общие для всех запросов процесса,
+    менять их нельзя.
+    """
+
+    def __init__(self, name, loader, size=None, timeout=None):
+        self.name = name
+        self.loader = loader
+        self.size = size or settings.OBJECT_CACHE_SIZE
+        self.timeout = timeout or settings.OBJECT_CACHE_TIMEOUT
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, key):
+        # Ключ может быть не ASCII, а memcached такие не принимает
+        return f'objects:{self.name}:{md5(str(key).encode()).hexdigest()}'
+
+    def _version(self, key):
+        return cache.get_or_set(f'{self._key(key)}:version', uuid4().hex, None)
+
+    def get(self, key):
+        version = self._version(key)
+        with self._lock:
+            local = self._local.get(key)
+            if local is not None and local[0] == version:
+                self._local.move_to_end(key)
+                return local[1]
+        shared_key = f'{self._key(key)}:{version}'
+        obj = cache.get(shared_key)
+        if obj is None:
+            obj = self.loader(key)
+            if obj is None:
+                return None
+            cache.set(shared_key, obj, self.timeout)
+        with self._lock:
+            self._local[key] = (version, obj)
+            self._local.move_to_end(key)
+            while len(self._local) > self.size:
+                self._local.popitem(last=False)
+        return obj
+
+    def _bump_version(self, key):
+        cache.set(f'{self._key(key)}:version', uuid4().hex, None)
+        with self._lock:
+            self._local.pop(key, None)
+
+    def invalidate(self, key):
+        """
+        Сбрасывает ключ сразу и ещё раз после коммита: запрос, прочитавший
+        строку до коммита, мог положить её в кэш под новой версией.
+        """
+        self._bump_version(key)
+        transaction.on_commit(lambda: self._bump_version(key))
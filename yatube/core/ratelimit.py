@@ -0,0 +1,119 @@
+import logging
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60): ёмкость корзины и время её полного пополнения."""
+    limit, period = rate.split('/')
+    return int(limit), PERIODS[period]
+
+
+def take_token(key, limit, period):
+    """
+    Забирает жетон из корзины ёмкостью limit, которая пополняется
+    на limit жетонов за period секунд. Возвращает 0, если жетон выдан,
+    иначе через сколько секунд появится следующий.
+
+    В кэше лежат момент отсчёта и число выданных жетонов; счётчик
+    меняется только атомарными incr/decr, поэтому параллельные
+    запросы не выдают лишних жетонов.
+    """
+    rate = limit / period
+    now = time.time()
+    start_key, spent_key = f'{key}:start', f'{key}:spent'
+    if cache.add(start_key, now, period):
+        cache.set(spent_key, 0, period)
+    start = cache.get(start_key, now)
+    try:
+        spent = cache.incr(spent_key)
+    except ValueError:
+        cache.set(spent_key, 1, period)
+        spent = 1
+    level = spent - (now - start) * rate
+    if level > limit:
+        cache.decr(spent_key)
+        return max(1, math.ceil((level - limit) / rate))
+    if level < 1:
+        # Корзина простаивала: сдвигаем отсчёт, чтобы накопленных
+        # жетонов было не больше ёмкости.
+        cache.set(start_key, now - (spent - 1) / rate, period)
+    else:
+        cache.touch(start_key, period)
+    cache.touch(spent_key, period)
+    return 0
+
+
+def return_token(key):
+    """Возвращает в корзину жетон, выданный take_token."""
+    try:
+        cache.decr(f'{key}:spent')
+    except ValueError:
+        pass
+
+
+def client_ip(request):
+    """
+    Адрес клиента. За прокси все запросы приходят с его REMOTE_ADDR,
+    поэтому адрес берётся из RATELIMIT_IP_HEADER. В X-Forwarded-For
+    клиент может дописать что угодно слева, доверяем только последнему
+    адресу - его добавил наш фронтовый сервер.
+    """
+    header = settings.RATELIMIT_IP_HEADER
+    if header:
+        forwarded = request.META.get(header, '').split(',')[-1].strip()
+        if forwarded:
+            return forwarded
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def ratelimit(scope, methods=('POST',)):
+    """
+    Ограничивает частоту запросов к представлению по правилам
+    RATELIMITS[scope]: 'user' - на пользователя, 'ip' - на адрес.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            rules = settings.RATELIMITS.get(scope, {})
+            if request.method not in methods or not rules:
+                return view(request, *args, **kwargs)
+            idents = []
+            if 'ip' in rules:
+                idents.append(('ip', client_ip(request)))
+            if 'user' in rules and request.user.is_authenticated:
+                idents.append(('user', request.user.pk))
+            taken = []
+            for kind, ident in idents:
+                key = f'ratelimit:{scope}:{kind}:{ident}'
+                limit, period = parse_rate(rules[kind])
+                retry_after = take_token(key, limit, period)
+                if retry_after:
+                    # Отклонённый запрос не должен тратить жетоны
+                    # других корзин
+                    for taken_key in taken:
+                        return_token(taken_key)
+                    logger.warning(
+                        'Отклонён запрос %s %s:%s, повтор через %s с',
+                        scope, kind, ident, retry_after
+                    )
+                    response = render(
+                        request, 'core/429.html',
+                        {'retry_after': retry_after}, status=429
+                    )
+                    response['Retry-After'] = str(retry_after)
+                    return response
+                taken.append(key)
+                logger.debug('Пропущен запрос %s %s:%s', scope, kind, ident)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
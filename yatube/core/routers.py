@@ -0,0 +1,83 @@
+import random
+import threading
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def pin_to_primary():
+    _state.pinned = True
+
+
+def unpin():
+    _state.pinned = False
+    _state.wrote = False
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def mark_write():
+    _state.wrote = True
+
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def track_writes(execute, sql, params, many, context):
+    # execute_wrapper для основной базы: отмечает запросы на запись
+    if sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+        mark_write()
+    return execute(sql, params, many, context)
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+class SplitTablesRouter:
+    """
+    Таблицы из settings.DATABASE_TABLE_ROUTES живут в собственных базах.
+    В default остаются их пустые копии: каскадное удаление Django
+    ищет связанные записи в базе удаляемого объекта.
+    """
+
+    def route(self, model):
+        return settings.DATABASE_TABLE_ROUTES.get(model._meta.label_lower)
+
+    def db_for_read(self, model, **hints):
+        return self.route(model)
+
+    def db_for_write(self, model, **hints):
+        return self.route(model)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in settings.DATABASE_TABLE_ROUTES.values():
+            return None
+        label = f'{app_label}.{model_name}'
+        return settings.DATABASE_TABLE_ROUTES.get(label) == db
+
+
+class PrimaryReplicaRouter:
+    """
+    Чтение с реплик из settings.DATABASE_REPLICAS, запись - в default.
+    Пока запрос закреплён за основной базой (см. ReplicaPinMiddleware),
+    чтение тоже идёт в default.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned() or has_written():
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
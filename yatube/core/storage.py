@@ -0,0 +1,93 @@
+import gzip
+import os
+import posixpath
+import re
+from hashlib import md5
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml',
+                '.map', '.ico')
+SHARD = re.compile(r'[0-9a-f]{2}')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Манифест с хэшами в именах файлов плюс сжатые копии .gz, которые
+    collectstatic пишет рядом с оригиналами, чтобы не сжимать на лету.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE) and self.compress(name):
+                yield name, f'{name}.gz', True
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            content = source.read()
+        compressed = gzip.compress(content, compresslevel=9)
+        if len(compressed) >= len(content):
+            return False
+        with open(f'{path}.gz', 'wb') as target:
+            target.write(compressed)
+        return True
+
+    def stored_name(self, name):
+        # Файла нет в манифесте (статика не собрана или файл не добавлен
+        # в репозиторий): отдаём имя без хэша вместо ошибки 500
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+def sharded_name(name):
+    """
+    'posts/photo.jpg' -> 'posts/3f/a1/photo.jpg': MEDIA_SHARD_DEPTH уровней
+    каталогов по md5 имени файла. Для уже разложенного имени - то же имя.
+    Разложенное имя узнаётся по каталогам, а не по md5: get_available_name
+    мог добавить к имени файла суффикс уже внутри подкаталога.
+    """
+    dirname, basename = posixpath.split(name)
+    depth = settings.MEDIA_SHARD_DEPTH
+    parts = dirname.split('/')
+    if len(parts) >= depth and all(
+        SHARD.fullmatch(part) for part in parts[-depth:]
+    ):
+        return name
+    digest = md5(basename.encode()).hexdigest()
+    shards = [digest[level * 2:level * 2 + 2] for level in range(depth)]
+    return posixpath.join(dirname, *shards, basename)
+
+
+class ShardedFileSystemStorage(FileSystemStorage):
+    """
+    Загрузки раскладываются по хэшированным подкаталогам, чтобы в одном
+    каталоге не копились миллионы файлов. Миниатюры sorl и так лежат
+    в cache/xx/xx/, их имена сюда не попадают.
+    """
+
+    def generate_filename(self, filename):
+        return super().generate_filename(sharded_name(filename))
+
+    def link(self, name, target):
+        """
+        Делает копию name под именем target жёсткой ссылкой, без чтения
+        файла; если ссылка невозможна - копирует. Возвращает новое имя.
+        """
+        target = self.get_available_name(target)
+        path = self.path(target)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.link(self.path(name), path)
+        except OSError:
+            with self.open(name) as content:
+                return self.save(target, content)
+        return target
@@ -0,0 +1,109 @@
+"""
+Кэш с тегами. У каждого тега есть версия в кэше, ключ записи
+включает версии всех её тегов. Сброс тега - одна запись новой версии:
+старые записи больше не находятся и истекают сами.
+
+cached() к тому же защищает от лавины промахов, когда запись
+истекает у многих запросов сразу.
+"""
+import math
+import random
+import time
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _tag_key(tag):
+    # В слагах бывают символы, недопустимые в ключах memcached
+    return f'tag:{md5(str(tag).encode()).hexdigest()}'
+
+
+def tag_versions(tags):
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = cache.get_or_set(key, uuid4().hex, None)
+    return [versions[key] for key in keys]
+
+
+def tagged_key(key, tags):
+    stamp = ':'.join(
+        f'{tag}={version}' for tag, version in zip(tags, tag_versions(tags))
+    )
+    return f'{key}:{md5(stamp.encode()).hexdigest()}'
+
+
+def get_tagged(key, tags, default=None):
+    return cache.get(tagged_key(key, tags), default)
+
+
+def set_tagged(key, value, tags, timeout=None):
+    cache.set(tagged_key(key, tags), value, timeout)
+
+
+def _expires_early(fresh_until, delta):
+    """
+    Вероятностное раннее истечение (XFetch): чем ближе конец срока
+    и чем дольше считается значение, тем вероятнее пересчитать его
+    заранее. Запросы истекают вразнобой, а не все в одну секунду.
+    """
+    early = -delta * settings.CACHE_EARLY_BETA * math.log(
+        1 - random.random()
+    )
+    return time.time() + early >= fresh_until
+
+
+def _wait(key):
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cached(key, compute, timeout, tags=(), stale=None):
+    """
+    Значение из кэша или compute(). Считает один запрос, он берёт
+    блокировку в кэше. Остальные получают устаревшее значение, которое
+    хранится ещё stale секунд после timeout, а если его нет - ждут
+    до CACHE_LOCK_WAIT секунд и только потом считают сами.
+    """
+    if stale is None:
+        stale = settings.CACHE_STALE_TIMEOUT
+    if tags:
+        key = tagged_key(key, tags)
+    lock = f'{key}:lock'
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until, delta = entry
+        if not _expires_early(fresh_until, delta):
+            return value
+        if not cache.add(lock, 1, settings.CACHE_LOCK_TIMEOUT):
+            return value
+    elif not cache.add(lock, 1, settings.CACHE_LOCK_TIMEOUT):
+        entry = _wait(key)
+        if entry is not None:
+            return entry[0]
+        lock = None
+    try:
+        start = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - start
+        cache.set(
+            key, (value, time.time() + timeout, delta), timeout + stale
+        )
+        return value
+    finally:
+        if lock:
+            cache.delete(lock)
+
+
+def invalidate_tags(*tags):
+    if tags:
+        cache.set_many({_tag_key(tag): uuid4().hex for tag in tags}, None)
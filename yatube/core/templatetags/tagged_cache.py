@@ -0,0 +1,50 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.tagged_cache import cached
+
+register = template.Library()
+
+
+class TaggedCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, name, tags, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.tags = tags
+        self.vary_on = vary_on
+
+    def render(self, context):
+        key = make_template_fragment_key(
+            self.name, [var.resolve(context) for var in self.vary_on]
+        )
+        return cached(
+            key,
+            lambda: self.nodelist.render(context),
+            self.timeout.resolve(context),
+            list(self.tags.resolve(context) or ()),
+        )
+
+
+@register.tag('tagged_cache')
+def do_tagged_cache(parser, token):
+    """
+    {% tagged_cache <timeout> <name> <список тегов или None> [vary_on ...] %}
+    Как {% cache %}, но фрагмент сбрасывается сбросом любого из тегов,
+    а после timeout ещё CACHE_STALE_TIMEOUT секунд отдаётся устаревшим,
+    пока его пересчитывает один запрос.
+    """
+    nodelist = parser.parse(('endtagged_cache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 4:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает не меньше трёх аргументов.'
+        )
+    return TaggedCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        bits[2],
+        parser.compile_filter(bits[3]),
+        [parser.compile_filter(bit) for bit in bits[4:]],
+    )
@@ -1,4 +1,44 @@
-from django.test import Client, TestCase
+import gzip
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles import finders
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.templatetags.static import static
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, UserDeletion
+from posts.utils import authors_by_username, groups_by_slug
+
+from .auth import CachedModelBackend
+from .html import minify_html, minify_stream
+from .jobs import claim_jobs, enqueue, queue_stats, requeue_stale
+from .mail import DELIVER_JOB, deliver_outbox
+from .middleware import StreamingGZipMiddleware
+from .models import Job, OutboxMessage
+from .object_cache import TwoTierCache
+from .ratelimit import take_token
+from .routers import (PrimaryReplicaRouter, SplitTablesRouter, mark_write,
+                      pin_to_primary, unpin)
+from .tagged_cache import cached, get_tagged, invalidate_tags, set_tagged
+from .views import static_file
+
+User = get_user_model()
 
 
 class CoreURLTests(TestCase):
@@ -9,3 +49,698 @@ class CoreURLTests(TestCase):
         """Страница 404 отдает кастомный шаблон."""
         response = self.guest_client.get('/unexisting_page/', follow=True)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class PrimaryReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.addCleanup(unpin)
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        """Чтение уходит на реплику, запись - в основную базу."""
+        self.assertEqual(self.router.db_for_read(Post), 'replica1')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_reads_stick_to_primary_after_write(self):
+        """После записи и при закреплении чтение идёт в основную базу."""
+        mark_write()
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        unpin()
+        pin_to_primary()
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_no_migrations_on_replica(self):
+        """Миграции не применяются к репликам."""
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+
+
+@override_settings(DATABASE_TABLE_ROUTES={
+    'posts.follow': 'social',
+    'posts.comment': 'comments',
+})
+class SplitTablesRouterTests(TestCase):
+    def setUp(self):
+        self.router = SplitTablesRouter()
+
+    def test_hot_tables_use_own_database(self):
+        """Follow и Comment читаются и пишутся в свои базы."""
+        self.assertEqual(self.router.db_for_read(Follow), 'social')
+        self.assertEqual(self.router.db_for_write(Comment), 'comments')
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_migrations_follow_routes(self):
+        """В отдельную базу мигрирует только её таблица."""
+        self.assertTrue(
+            self.router.allow_migrate('social', 'posts', 'follow')
+        )
+        self.assertFalse(self.router.allow_migrate('social', 'posts', 'post'))
+        self.assertIsNone(
+            self.router.allow_migrate('default', 'posts', 'follow')
+        )
+
+
+class ReplicaPinMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def test_write_sets_pin_cookie(self):
+        """Запись в базу закрепляет клиента за основной базой."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Комментарий'}
+        )
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_read_does_not_set_pin_cookie(self):
+        """Чтение не закрепляет клиента за основной базой."""
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+
+class SQLitePragmaTests(TestCase):
+    def test_connection_uses_production_pragmas(self):
+        """Соединение с SQLite открывается с настройками SQLITE_PRAGMAS."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(
+                cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout']
+            )
+            cursor.execute('PRAGMA synchronous')
+            # 1 - NORMAL
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+@override_settings(RATELIMITS={
+    'add_comment': {'user': '2/m'},
+    'signup': {'ip': '1/h'},
+    'follow': {'user': '1/h', 'ip': '2/h'},
+})
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_bucket_refills_over_time(self):
+        """Жетоны пополняются со временем, но не сверх ёмкости."""
+        with mock.patch('core.ratelimit.time.time', return_value=1000):
+            self.assertEqual(take_token('test', 2, 60), 0)
+            self.assertEqual(take_token('test', 2, 60), 0)
+            self.assertEqual(take_token('test', 2, 60), 30)
+        with mock.patch('core.ratelimit.time.time', return_value=1030):
+            self.assertEqual(take_token('test', 2, 60), 0)
+            self.assertEqual(take_token('test', 2, 60), 30)
+
+    def test_exhausted_bucket_returns_429(self):
+        """Сверх лимита запрос отклоняется с кодом 429 и Retry-After."""
+        url = reverse('posts:add_comment', args=(self.post.pk,))
+        for _ in range(2):
+            self.client.post(url, {'text': 'Комментарий'})
+        with self.assertLogs('core.ratelimit', 'WARNING'):
+            response = self.client.post(url, {'text': 'Лишний'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTemplateUsed(response, 'core/429.html')
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_limit_is_per_ip(self):
+        """Лимит по адресу не зависит от пользователя."""
+        url = reverse('users:signup')
+        self.client.post(url, {})
+        with self.assertLogs('core.ratelimit', 'WARNING'):
+            self.assertEqual(self.client.post(url, {}).status_code, 429)
+        self.assertEqual(
+            Client(REMOTE_ADDR='10.0.0.1').post(url, {}).status_code, 200
+        )
+        # GET формы жетонов не тратит
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(RATELIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR')
+    def test_ip_from_proxy_header(self):
+        """За прокси лимит считается по адресу из X-Forwarded-For."""
+        url = reverse('users:signup')
+        self.client.post(url, {}, HTTP_X_FORWARDED_FOR='1.1.1.1, 10.0.0.1')
+        with self.assertLogs('core.ratelimit', 'WARNING'):
+            response = self.client.post(
+                url, {}, HTTP_X_FORWARDED_FOR='2.2.2.2, 10.0.0.1'
+            )
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post(
+            url, {}, HTTP_X_FORWARDED_FOR='10.0.0.2'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_rejected_request_keeps_ip_token(self):
+        """Отказ по лимиту пользователя не тратит жетон адреса."""
+        author = User.objects.create_user(username='author')
+        url = reverse('posts:profile_follow', args=(author.username,))
+        self.client.post(url)
+        with self.assertLogs('core.ratelimit', 'WARNING'):
+            for _ in range(3):
+                self.assertEqual(self.client.post(url).status_code, 429)
+        other = Client()
+        other.force_login(User.objects.create_user(username='other'))
+        self.assertNotEqual(other.post(url).status_code, 429)
+
+
+def store_job(key, value):
+    cache.set(key, value)
+
+
+def failing_job():
+    raise ValueError('Ошибка задачи')
+
+
+class JobQueueTests(TestCase):
+    def run_workers(self):
+        out = StringIO()
+        call_command('run_workers', once=True, concurrency=1, stdout=out)
+        return out.getvalue()
+
+    def test_job_runs_once(self):
+        """Задача выполняется и отмечается выполненной."""
+        job = enqueue('core.tests.store_job', 'job-key', value='готово')
+        self.assertIn('Выполнено задач: 1', self.run_workers())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(cache.get('job-key'), 'готово')
+        self.assertIn('Выполнено задач: 0', self.run_workers())
+
+    def test_claimed_job_not_claimed_again(self):
+        """Задачу забирает только один обработчик."""
+        enqueue('core.tests.failing_job')
+        self.assertEqual(len(claim_jobs('first', 10)), 1)
+        self.assertEqual(claim_jobs('second', 10), [])
+
+    def test_failed_job_retried_with_backoff(self):
+        """Упавшая задача откладывается, после всех попыток - ошибка."""
+        job = enqueue('core.tests.failing_job', max_attempts=2)
+        with self.assertLogs('core.management.commands.run_workers'):
+            self.run_workers()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('Ошибка задачи', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.management.commands.run_workers'):
+            self.run_workers()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_stale_job_requeued(self):
+        """Задача пропавшего обработчика возвращается в очередь."""
+        job = enqueue('core.tests.failing_job')
+        claim_jobs('lost', 1)
+        Job.objects.filter(pk=job.pk).update(
+            started=timezone.now() - timedelta(
+                seconds=settings.JOB_TIMEOUT + 1
+            )
+        )
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(queue_stats()['queued'], 1)
+
+
+class BrokenEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxBackend',
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class OutboxTests(TestCase):
+    def test_password_reset_goes_to_outbox(self):
+        """Письмо сброса пароля сохраняется и отправляется отдельно."""
+        User.objects.create_user(
+            username='auth', email='auth@example.com', password='pass'
+        )
+        self.client.post(
+            reverse('users:password_reset_form'),
+            {'email': 'auth@example.com'}
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.recipients, 'auth@example.com')
+        deliver_outbox()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['auth@example.com'])
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.SENT)
+
+    @override_settings(
+        OUTBOX_EMAIL_BACKEND='core.tests.BrokenEmailBackend',
+        OUTBOX_MAX_ATTEMPTS=2,
+    )
+    def test_undelivered_message_retried_then_dead(self):
+        """Недоставленное письмо повторяется, затем помечается мёртвым."""
+        mail.send_mail('Тема', 'Текст', None, ['reader@example.com'])
+        deliver_outbox()
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, OutboxMessage.QUEUED)
+        self.assertIn('SMTP недоступен', message.last_error)
+        self.assertTrue(Job.objects.filter(name=DELIVER_JOB).exists())
+        OutboxMessage.objects.update(next_attempt=timezone.now())
+        deliver_outbox()
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.DEAD)
+        self.assertEqual(message.attempts, 2)
+
+    def test_resend_skips_messages_being_sent(self):
+        """Повтор из админки не трогает письма, которые сейчас отправляются."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        stale = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT + 1)
+        dead, sending, stuck = (
+            OutboxMessage.objects.create(
+                subject='Тема', recipients='reader@example.com',
+                message='{}', status=status, attempts=3, next_attempt=when
+            )
+            for status, when in (
+                (OutboxMessage.DEAD, stale),
+                (OutboxMessage.SENDING, timezone.now()),
+                (OutboxMessage.SENDING, stale),
+            )
+        )
+        self.client.post(reverse('admin:core_outboxmessage_changelist'), {
+            'action': 'resend',
+            '_selected_action': [dead.pk, sending.pk, stuck.pk],
+        })
+        for message, status in (
+            (dead, OutboxMessage.QUEUED),
+            (sending, OutboxMessage.SENDING),
+            (stuck, OutboxMessage.QUEUED),
+        ):
+            message.refresh_from_db()
+            with self.subTest(pk=message.pk):
+                self.assertEqual(message.status, status)
+
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth', password='old')
+        self.backend = CachedModelBackend()
+
+    def test_user_read_from_cache(self):
+        """Повторное чтение пользователя сессии не идёт в базу."""
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.get_user(self.user.pk), self.user)
+
+    def test_password_change_invalidates_cache(self):
+        """После смены пароля старая сессия перестаёт действовать."""
+        self.client.force_login(self.user)
+        self.client.get(reverse('posts:index'))
+        self.user.set_password('new')
+        self.user.save()
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertRedirects(
+            response,
+            reverse('users:login') + '?next=' + reverse('posts:follow_index')
+        )
+
+    def test_pending_deletion_blocks_login(self):
+        """Пользователь, ждущий удаления, не входит и теряет сессию."""
+        self.client.force_login(self.user)
+        self.client.get(reverse('posts:index'))
+        UserDeletion.objects.create(user=self.user)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(
+            Client().login(username='auth', password='old')
+        )
+        UserDeletion.objects.filter(user=self.user).delete()
+        self.assertTrue(Client().login(username='auth', password='old'))
+
+    def test_purge_sessions_removes_expired(self):
+        """Команда удаляет только истёкшие сессии."""
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(
+                session_key=f'key{i}',
+                session_data='',
+                expire_date=now + timedelta(days=1 if i % 2 else -1)
+            )
+            for i in range(5)
+        )
+        out = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=out)
+        self.assertIn('Удалено сессий: 3', out.getvalue())
+        self.assertEqual(Session.objects.count(), 2)
+
+
+class StaticPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.settings = override_settings(STATIC_ROOT=cls.static_root)
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.static_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_hashed_file_served_gzipped_and_immutable(self):
+        """Файл с хэшем отдаётся сжатым и кэшируется навсегда."""
+        url = static('vendor/bootstrap/css/bootstrap.min.css')
+        self.assertRegex(url, r'bootstrap\.min\.[0-9a-f]{12}\.css$')
+        request = RequestFactory().get(url, HTTP_ACCEPT_ENCODING='gzip')
+        response = static_file(request, url[len(settings.STATIC_URL):])
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        path = finders.find('vendor/bootstrap/css/bootstrap.min.css')
+        with open(path, 'rb') as original:
+            self.assertEqual(
+                gzip.decompress(b''.join(response.streaming_content)),
+                original.read()
+            )
+
+    def test_html_page_preloads_critical_css(self):
+        """HTML-страница подсказывает предзагрузку CSS."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn(
+            '<{}>; rel=preload; as=style'.format(
+                static('vendor/bootstrap/css/bootstrap.min.css')
+            ),
+            response['Link']
+        )
+
+
+class HtmlCompressionTests(TestCase):
+    HTML = (
+        '<!-- комментарий -->\n<div>\n    <p>Текст</p>\n</div>\n'
+        '<pre>  отступы\n    сохраняются  </pre>\n'
+        '<!--[if IE]><p>IE</p><![endif]-->\n'
+        '<textarea>  как   есть  </textarea>'
+    )
+
+    def test_minify_keeps_preformatted_content(self):
+        """Комментарии и отступы удаляются, <pre> и <textarea> - нет."""
+        self.assertEqual(
+            minify_html(self.HTML),
+            '\n<div>\n<p>Текст</p>\n</div>\n'
+            '<pre>  отступы\n    сохраняются  </pre>\n'
+            '<!--[if IE]><p>IE</p><![endif]-->\n'
+            '<textarea>  как   есть  </textarea>'
+        )
+
+    def test_stream_minified_like_whole_page(self):
+        """Разрезанный на части HTML сжимается так же, как целый."""
+        content = self.HTML.encode()
+        chunks = [content[i:i + 7] for i in range(0, len(content), 7)]
+        self.assertEqual(
+            b''.join(minify_stream(chunks, 'utf-8')).decode(),
+            minify_html(self.HTML)
+        )
+
+    def test_streaming_response_gzipped_without_buffering(self):
+        """Потоковый ответ сжимается и отдаётся по частям."""
+        consumed = []
+
+        def chunks():
+            for i in range(3):
+                consumed.append(i)
+                yield f'<p>Часть {i}</p>\n'.encode() * 100
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        middleware = StreamingGZipMiddleware(
+            lambda request: StreamingHttpResponse(chunks())
+        )
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        stream = iter(response.streaming_content)
+        first = next(stream)
+        self.assertEqual(consumed, [0])
+        content = gzip.decompress(first + b''.join(stream)).decode()
+        self.assertEqual(content.count('<p>Часть 2</p>'), 100)
+
+    def test_page_minified_and_gzipped(self):
+        """Страница отдаётся сжатой и без HTML-комментариев."""
+        response = self.client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertNotIn(b'<!--', gzip.decompress(response.content))
+
+
+class TaggedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_tag_drops_tagged_entries(self):
+        """Сброс тега сбрасывает только записи с этим тегом."""
+        set_tagged('first', 1, ['post:1', 'author:1'])
+        set_tagged('second', 2, ['post:2', 'author:1'])
+        set_tagged('third', 3, ['post:3'])
+        invalidate_tags('author:1')
+        self.assertIsNone(get_tagged('first', ['post:1', 'author:1']))
+        self.assertIsNone(get_tagged('second', ['post:2', 'author:1']))
+        self.assertEqual(get_tagged('third', ['post:3']), 3)
+
+    def counter(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+        return compute
+
+    def test_cached_recomputes_after_invalidation(self):
+        """Значение считается заново только после сброса тега."""
+        compute = self.counter()
+        self.assertEqual(cached('key', compute, 60, ['group:слаг']), 1)
+        self.assertEqual(cached('key', compute, 60, ['group:слаг']), 1)
+        invalidate_tags('group:слаг')
+        self.assertEqual(cached('key', compute, 60, ['group:слаг']), 2)
+
+    def test_expired_value_recomputed(self):
+        """Устаревшее значение пересчитывается."""
+        compute = self.counter()
+        cached('key', compute, 0)
+        self.assertEqual(cached('key', compute, 0), 2)
+
+    def test_stale_value_served_while_recomputed(self):
+        """Пока значение пересчитывает другой запрос, отдаётся старое."""
+        compute = self.counter()
+        cached('key', compute, 0)
+        cache.add('key:lock', 1)
+        self.assertEqual(cached('key', compute, 0), 1)
+
+    @override_settings(CACHE_LOCK_WAIT=0.1)
+    def test_miss_waits_for_lock_holder(self):
+        """При промахе запрос ждёт того, кто считает значение."""
+        compute = self.counter()
+        cache.add('key:lock', 1)
+        with mock.patch('core.tagged_cache.cache.get', side_effect=[
+            None, None, (10, time.time() + 60, 0)
+        ]):
+            self.assertEqual(cached('key', compute, 60), 10)
+        self.assertEqual(compute(), 1)
+
+    @override_settings(CACHE_LOCK_WAIT=0.1)
+    def test_miss_computed_when_wait_runs_out(self):
+        """Не дождавшись блокировки, запрос считает значение сам."""
+        cache.add('key:lock', 1)
+        self.assertEqual(cached('key', self.counter(), 60), 1)
+        self.assertTrue(cache.get('key:lock'))
+
+    def test_early_expiration(self):
+        """Значение может быть пересчитано незадолго до истечения."""
+        compute = self.counter()
+        cached('key', lambda: time.sleep(0.05) or 0, 1)
+        with mock.patch('core.tagged_cache.random.random', return_value=0):
+            self.assertEqual(cached('key', compute, 1), 0)
+        with mock.patch(
+            'core.tagged_cache.random.random', return_value=1 - 1e-15
+        ):
+            self.assertEqual(cached('key', compute, 1), 1)
+
+
+class TwoTierCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.loads = []
+
+    def loader(self, key):
+        self.loads.append(key)
+        return {'key': key, 'load': len(self.loads)}
+
+    def test_local_copy_used_while_version_matches(self):
+        """Повторное чтение берёт объект из памяти процесса."""
+        objects = TwoTierCache('test', self.loader)
+        first = objects.get('a')
+        self.assertIs(objects.get('a'), first)
+        self.assertEqual(self.loads, ['a'])
+
+    def test_other_process_reads_shared_tier(self):
+        """Другой процесс берёт объект из общего кэша, не из loader."""
+        TwoTierCache('test', self.loader).get('a')
+        self.assertEqual(TwoTierCache('test', self.loader).get('a')['load'], 1)
+        self.assertEqual(self.loads, ['a'])
+
+    def test_invalidate_seen_by_other_processes(self):
+        """Сброс в одном процессе устаревает копии в остальных."""
+        first, second = (TwoTierCache('test', self.loader) for _ in range(2))
+        first.get('a')
+        second.get('a')
+        first.invalidate('a')
+        self.assertEqual(second.get('a')['load'], 2)
+
+    def test_invalidate_repeated_after_commit(self):
+        """Объект, прочитанный до коммита, сбрасывается после него."""
+        objects = TwoTierCache('test', self.loader)
+        with mock.patch(
+            'core.object_cache.transaction.on_commit'
+        ) as on_commit:
+            objects.invalidate('a')
+        objects.get('a')
+        on_commit.call_args[0][0]()
+        self.assertEqual(objects.get('a')['load'], 2)
+
+    def test_size_bounded(self):
+        """В памяти процесса хранится не больше size объектов."""
+        objects = TwoTierCache('test', self.loader, size=2)
+        for key in 'abc':
+            objects.get(key)
+        self.assertEqual(list(objects._local), ['b', 'c'])
+
+    def test_missing_object_not_cached(self):
+        """Отсутствующий объект не кэшируется."""
+        objects = TwoTierCache('test', lambda key: None)
+        self.assertIsNone(objects.get('a'))
+        self.assertEqual(len(objects._local), 0)
+
+    def test_group_lookup_without_queries(self):
+        """Группа по слагу читается без запросов и сбрасывается при правке."""
+        group = Group.objects.create(title='Группа', slug='group')
+        groups_by_slug.get('group')
+        with self.assertNumQueries(0):
+            self.assertEqual(groups_by_slug.get('group'), group)
+        group.slug = 'renamed'
+        group.save()
+        self.assertIsNone(groups_by_slug.get('group'))
+        self.assertEqual(groups_by_slug.get('renamed').slug, 'renamed')
+
+    def test_author_kept_on_login(self):
+        """Вход не сбрасывает автора в кэше, смена имени сбрасывает."""
+        user = User.objects.create_user(username='author')
+        authors_by_username.get('author')
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            authors_by_username.get('author')
+        user.username = 'renamed'
+        user.save(update_fields=['username'])
+        self.assertIsNone(authors_by_username.get('author'))
+        self.assertEqual(authors_by_username.get('renamed'), user)
+
+
+class MediaServingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.settings.enable()
+        for name in ('cache/ab/cd/thumb.jpg', 'posts/ab/cd/photo.jpg'):
+            path = os.path.join(cls.media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as image:
+                image.write(b'0123456789')
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def get(self, name, **headers):
+        return self.client.get(f'{settings.MEDIA_URL}{name}', **headers)
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect')
+    def test_file_handed_to_nginx(self):
+        """С nginx Django отдаёт только заголовки, без содержимого файла."""
+        response = self.get('cache/ab/cd/thumb.jpg')
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/cache/ab/cd/thumb.jpg'
+        )
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=', response['Cache-Control'])
+
+    @override_settings(MEDIA_ACCEL='x-sendfile')
+    def test_file_handed_to_sendfile(self):
+        """С X-Sendfile передаётся полный путь к файлу."""
+        response = self.get('cache/ab/cd/thumb.jpg')
+        self.assertEqual(response['X-Sendfile'], os.path.join(
+            MediaServingTests.media_root, 'cache/ab/cd/thumb.jpg'
+        ))
+        self.assertEqual(response.content, b'')
+
+    def test_range_without_front_server(self):
+        """Без фронтового сервера Django сам отдаёт запрошенный диапазон."""
+        response = self.get('cache/ab/cd/thumb.jpg', HTTP_RANGE='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, b'234')
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        response = self.get('cache/ab/cd/thumb.jpg', HTTP_RANGE='bytes=-3')
+        self.assertEqual(response.content, b'789')
+        response = self.get('cache/ab/cd/thumb.jpg', HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_not_modified(self):
+        """Неизменённый файл не отдаётся повторно."""
+        response = self.get('cache/ab/cd/thumb.jpg')
+        response = self.get(
+            'cache/ab/cd/thumb.jpg',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_checked_image_not_cached_publicly(self):
+        """Картинку поста с проверкой доступа не хранят общие кэши."""
+        Post.objects.create(
+            author=MediaServingTests.author, text='Пост',
+            image='posts/ab/cd/photo.jpg'
+        )
+        response = self.get('posts/ab/cd/photo.jpg')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        response = self.get('cache/ab/cd/thumb.jpg')
+        self.assertTrue(response['Cache-Control'].startswith('public'))
+
+    def test_hidden_post_image_not_served(self):
+        """Картинка скрытого или удалённого поста не отдаётся."""
+        post = Post.objects.create(
+            author=MediaServingTests.author, text='Пост',
+            image='posts/ab/cd/photo.jpg'
+        )
+        self.assertEqual(self.get(post.image.name).status_code, 200)
+        UserDeletion.objects.create(user=MediaServingTests.author)
+        self.assertEqual(self.get(post.image.name).status_code, 404)
+        post.delete()
+        self.assertEqual(self.get('posts/ab/cd/photo.jpg').status_code, 404)
+        self.assertEqual(self.get('posts/.hidden').status_code, 404)
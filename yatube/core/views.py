@@ -1,4 +1,20 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified)
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.utils.module_loading import import_string
+from django.views.static import was_modified_since
+
+# ManifestStaticFilesStorage добавляет к имени 12 символов md5
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/]+$')
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
 
 
 def page_not_found(request, exception):
@@ -15,3 +31,129 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def static_file(request, path):
+    """
+    Отдаёт собранную статику: сжатую копию, если клиент принимает gzip,
+    и на STATIC_MAX_AGE без перепроверки для имён с хэшем.
+    """
+    full_path = safe_join(settings.STATIC_ROOT, path)
+    if not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime, stat.st_size
+    ):
+        return HttpResponseNotModified()
+    content_type, _ = mimetypes.guess_type(full_path)
+    encoding = None
+    accepts = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if 'gzip' in accepts and os.path.isfile(f'{full_path}.gz'):
+        full_path, encoding = f'{full_path}.gz', 'gzip'
+    response = FileResponse(
+        open(full_path, 'rb'),
+        content_type=content_type or 'application/octet-stream'
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if HASHED_NAME.search(path):
+        response['Cache-Control'] = (
+            f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+        )
+    else:
+        response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _byte_range(request, size):
+    """
+    (начало, конец) из заголовка Range с одним диапазоном, None без него
+    или для нескольких диапазонов (тогда отдаётся весь файл).
+    Для недопустимого диапазона - ValueError.
+    """
+    match = BYTE_RANGE.match(request.META.get('HTTP_RANGE', ''))
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end:
+            raise ValueError
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end or size - 1), size - 1)
+    if start > end:
+        raise ValueError
+    return start, end
+
+
+def _send_file(request, full_path, size, content_type):
+    """Отдача файла самим Django: только без фронтового сервера."""
+    try:
+        byte_range = _byte_range(request, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        return FileResponse(open(full_path, 'rb'), content_type=content_type)
+    start, end = byte_range
+    with open(full_path, 'rb') as file:
+        file.seek(start)
+        response = HttpResponse(
+            file.read(end - start + 1), content_type=content_type, status=206
+        )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def media_file(request, path):
+    """
+    Загруженные файлы. Django только проверяет доступ
+    (MEDIA_ACCESS_CHECKS) и ставит заголовки кэширования, а сам файл
+    с поддержкой Range отдаёт фронтовый сервер по X-Accel-Redirect
+    (nginx) или X-Sendfile (Apache, lighttpd), без копирования через
+    Python. Без MEDIA_ACCEL файл отдаёт Django - для разработки.
+    """
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    full_path = safe_join(settings.MEDIA_ROOT, path)
+    if not os.path.isfile(full_path):
+        raise Http404
+    checked = False
+    for prefix, check in settings.MEDIA_ACCESS_CHECKS.items():
+        if path.startswith(prefix):
+            if not import_string(check)(request, path):
+                raise Http404
+            checked = True
+    stat = os.stat(full_path)
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime, stat.st_size
+    ):
+        return HttpResponseNotModified()
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if settings.MEDIA_ACCEL == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(
+            f'{settings.MEDIA_ACCEL_LOCATION}{path}'
+        )
+    elif settings.MEDIA_ACCEL == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        response = _send_file(request, full_path, stat.st_size, content_type)
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if checked:
+        # Доступ зависит от пользователя и может закрыться в любой момент:
+        # общие кэши файл не хранят, браузер каждый раз переспрашивает
+        # и получает 304, пока проверка проходит
+        response['Cache-Control'] = 'private, no-cache'
+    else:
+        response['Cache-Control'] = (
+            f'public, max-age={settings.MEDIA_MAX_AGE}'
+        )
+    return response
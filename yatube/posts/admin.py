@@ -1,6 +1,134 @@
+import re
+
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import (ERROR_FLAG, IGNORED_PARAMS,
+                                             PAGE_VAR, SEARCH_VAR)
+from django.contrib.auth import get_permission_codename
+from django.shortcuts import render
+
+from core.jobs import enqueue
+
+from . import moderation
+from .deletion import delete_group_later
+from .models import Comment, Group, Post, UserDeletion
+from .utils import CachedCountPaginator
+
+
+class MoveToGroupForm(forms.Form):
+    group = forms.ModelChoiceField(Group.objects.all(), label='Группа')
+
+
+class ConfirmForm(forms.Form):
+    pass
+
+
+class PatternForm(forms.Form):
+    pattern = forms.CharField(
+        label='Текст содержит', min_length=3, max_length=200,
+        help_text='Без учёта регистра, в том числе для кириллицы.'
+    )
+
+
+def moderation_form(modeladmin, request, form, title):
+    """
+    Промежуточная страница действия: форма и выбранные строки
+    отправляются обратно в список с флажком apply.
+    """
+    return render(request, 'admin/posts/moderation_form.html', {
+        **modeladmin.admin_site.each_context(request),
+        'opts': modeladmin.model._meta,
+        'title': title,
+        'form': form,
+        'action': request.POST['action'],
+        'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+        'select_across': request.POST.get('select_across', '0'),
+        'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+    })
+
+
+def bound_form(form_class, request, **kwargs):
+    return form_class(
+        request.POST if 'apply' in request.POST else None, **kwargs
+    )
+
+
+def run_moderation(modeladmin, request, name, size, *args):
+    """
+    Выполняет posts.moderation.name сразу или, если строк больше
+    MODERATION_SYNC_LIMIT, ставит в очередь задач. Возвращает результат
+    или None, если задача ушла в фон.
+    """
+    if size > settings.MODERATION_SYNC_LIMIT:
+        job = enqueue(f'posts.moderation.{name}', *args)
+        modeladmin.message_user(
+            request,
+            f'Затронуто строк: {size}. Задача #{job.pk} выполняется в фоне, '
+            'ход выполнения - в журнале и в списке задач.'
+        )
+        return None
+    return getattr(moderation, name)(*args)
+
+
+def selected_ids(queryset):
+    return list(queryset.values_list('pk', flat=True))
+
+
+def selection_filters(modeladmin, request, queryset):
+    """
+    Условия выбранных в списке строк для posts.moderation. Отмеченные
+    флажками строки - не больше страницы, их id передаются как есть.
+    Если выбраны все строки, передаются параметры фильтров и поиска
+    из адреса списка, а не все id.
+    """
+    if request.POST.get('select_across', '0') == '0':
+        return [{'pk__in': selected_ids(queryset)}]
+    filters = {
+        key: value for key, value in request.GET.items()
+        if key not in (*IGNORED_PARAMS, PAGE_VAR, ERROR_FLAG)
+    }
+    return [filters, *modeladmin.search_filters(
+        request.GET.get(SEARCH_VAR, '')
+    )]
+
+
+class BackgroundDeletionMixin:
+    """
+    Удаление в админке только скрывает объект и ставит задачу удаления
+    (posts.deletion): каскад на тысячи строк не держит запрос и базу.
+    """
+    # Функция posts.deletion, которая скрывает объект и ставит задачу
+    delete_later = None
+    # Модели, строки которых удалит задача: на них тоже нужно право
+    # удаления, как при обычном каскаде
+    cascade_models = ()
 
-from .models import Comment, Group, Post
+    def delete_model(self, request, obj):
+        self.delete_later(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.delete_later(obj)
+
+    def get_deleted_objects(self, objs, request):
+        # Зависимые строки не перечисляем: их сбор - тот же каскад
+        deleted = [str(obj) for obj in objs]
+        perms_needed = {
+            model._meta.verbose_name
+            for model in (self.model, *self.cascade_models)
+            if not request.user.has_perm('{}.{}'.format(
+                model._meta.app_label,
+                get_permission_codename('delete', model._meta)
+            ))
+        }
+        return (
+            deleted,
+            {self.model._meta.verbose_name_plural: len(deleted)},
+            perms_needed,
+            [],
+        )
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -11,12 +139,160 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
-    list_editable = ('group',)
+    # Автор и группа приходят одним JOIN, а в форме выбираются поиском,
+    # без <select> со всеми пользователями и группами
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
+    # Фильтр по дате строит диапазон pub_date >= ... AND < ... по индексу
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+    actions = ('move_to_group', 'delete_authors_content', 'delete_by_pattern')
+
+    def move_to_group(self, request, queryset):
+        form = bound_form(MoveToGroupForm, request)
+        if not form.is_valid():
+            return moderation_form(
+                self, request, form, 'Перенести посты в группу'
+            )
+        filters = selection_filters(self, request, queryset)
+        moved = run_moderation(
+            self, request, 'move_posts',
+            moderation.filter_rows(Post, filters).count(),
+            filters, form.cleaned_data['group'].pk
+        )
+        if moved is not None:
+            self.message_user(request, f'Перенесено постов: {moved}')
+    move_to_group.short_description = 'Перенести в группу'
+
+    def delete_authors_content(self, request, queryset):
+        author_ids = sorted(set(queryset.values_list('author_id', flat=True)))
+        return delete_authors_content(self, request, author_ids)
+    delete_authors_content.short_description = (
+        'Удалить все посты и комментарии авторов'
+    )
+
+    def delete_by_pattern(self, request, queryset):
+        form = bound_form(
+            PatternForm, request, initial={'pattern': request.GET.get('q')}
+        )
+        if not form.is_valid():
+            return moderation_form(
+                self, request, form,
+                'Удалить выбранные посты, текст которых содержит строку'
+            )
+        # LIKE в SQLite не знает регистра кириллицы, а iregex там
+        # выполняет re из Python
+        filters = [
+            *selection_filters(self, request, queryset),
+            {'text__iregex': re.escape(form.cleaned_data['pattern'])},
+        ]
+        size = moderation.filter_rows(Post, filters).count()
+        deleted = run_moderation(self, request, 'delete_posts', size, filters)
+        if deleted is not None:
+            self.message_user(
+                request, 'Удалено постов: {}, комментариев: {}'.format(
+                    *deleted
+                )
+            )
+    delete_by_pattern.short_description = 'Удалить выбранные посты по тексту'
+
+    def search_id(self, search_term):
+        """Число из запроса вида 'id:123' или None."""
+        prefix, _, value = search_term.strip().partition(':')
+        if prefix == 'id' and value.strip().isdigit():
+            return int(value)
+        return None
+
+    def search_filters(self, search_term):
+        """Условия поиска из get_search_results для selection_filters."""
+        pk = self.search_id(search_term)
+        if pk is not None:
+            return [{'pk': pk}]
+        return [{'text__icontains': bit} for bit in search_term.split()]
+
+    def get_search_results(self, request, queryset, search_term):
+        # 'id:123' ищет пост по ключу, без LIKE; просто число
+        # ищется в тексте, как и любое другое слово
+        pk = self.search_id(search_term)
+        if pk is not None:
+            return queryset.filter(pk=pk), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+class GroupAdmin(BackgroundDeletionMixin, admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug', 'is_deleted')
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
+    actions = ('move_posts',)
+
+    def move_posts(self, request, queryset):
+        form = bound_form(MoveToGroupForm, request)
+        if not form.is_valid():
+            return moderation_form(
+                self, request, form, 'Перенести посты групп в группу'
+            )
+        filters = {'group_id__in': selected_ids(queryset)}
+        size = Post.objects.filter(**filters).count()
+        moved = run_moderation(
+            self, request, 'move_posts', size,
+            filters, form.cleaned_data['group'].pk
+        )
+        if moved is not None:
+            self.message_user(request, f'Перенесено постов: {moved}')
+    move_posts.short_description = 'Перенести посты в другую группу'
+
+    delete_later = staticmethod(delete_group_later)
+    cascade_models = (Post, Comment)
+
+
+class CommentAdmin(admin.ModelAdmin):
+    # Комментарии могут лежать в отдельной базе, поэтому без JOIN:
+    # выводим id поста и автора
+    list_display = ('pk', 'text', 'post_id', 'author_id', 'created')
+    raw_id_fields = ('post', 'author')
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+    actions = ('delete_authors_content',)
+
+    def delete_authors_content(self, request, queryset):
+        author_ids = sorted(set(queryset.values_list('author_id', flat=True)))
+        return delete_authors_content(self, request, author_ids)
+    delete_authors_content.short_description = (
+        'Удалить все посты и комментарии авторов'
+    )
+
+
+def delete_authors_content(modeladmin, request, author_ids):
+    form = bound_form(ConfirmForm, request)
+    if not form.is_valid():
+        return moderation_form(
+            modeladmin, request, form,
+            'Удалить все посты и комментарии авторов с id '
+            + ', '.join(map(str, author_ids))
+        )
+    size = (
+        Post.objects.filter(author_id__in=author_ids).count()
+        + Comment.objects.filter(author_id__in=author_ids).count()
+    )
+    deleted = run_moderation(
+        modeladmin, request, 'delete_authors_content', size, author_ids
+    )
+    if deleted is not None:
+        modeladmin.message_user(
+            request, 'Удалено постов: {}, комментариев: {}'.format(*deleted)
+        )
+
+
+class UserDeletionAdmin(admin.ModelAdmin):
+    # Удаление строки отменяет удаление пользователя, пока задача ждёт
+    list_display = ('user', 'requested')
+    raw_id_fields = ('user',)
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Comment)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(UserDeletion, UserDeletionAdmin)
@@ -0,0 +1,75 @@
+"""
+Удаление пользователей и групп в фоне. Объект сразу скрывается:
+для пользователя создаётся UserDeletion, группа помечается is_deleted,
+их посты пропадают из лент (PostQuerySet.visible). Посты, комментарии,
+подписки и картинки задача удаляет пачками (posts.moderation), саму
+строку - последней, когда каскаду уже нечего удалять.
+
+Задачи выполняет run_workers в своём процессе: сброшенные ими кэши
+подписок и теги страниц видны сайту, только если CACHES - общий кэш
+(memcached, Redis), а не память процесса.
+"""
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+
+from core.jobs import enqueue
+
+from .models import ArchivedPost, Group, Post, UserDeletion
+from .moderation import delete_authors_content, delete_follows, delete_posts
+from .tasks import delete_thumbnails
+
+User = get_user_model()
+
+PURGE_USER_JOB = 'posts.deletion.purge_user'
+PURGE_GROUP_JOB = 'posts.deletion.purge_group'
+
+
+def hide_images(filters):
+    """
+    Удаляет миниатюры картинок скрытых постов. Оригиналы закрывает
+    posts.utils.can_view_image, а миниатюры лежат в cache/ под именами,
+    по которым пост не найти. Если посты снова покажут, миниатюры
+    пересчитаются при первом показе.
+    """
+    for model in (Post, ArchivedPost):
+        delete_thumbnails(model.objects.filter(**filters).exclude(
+            image=''
+        ).values_list('image', flat=True).iterator())
+
+
+def delete_user_later(user):
+    UserDeletion.objects.get_or_create(user=user)
+    hide_images({'author_id': user.pk})
+    transaction.on_commit(
+        lambda: enqueue(PURGE_USER_JOB, user.pk),
+        using=router.db_for_write(User)
+    )
+
+
+def delete_group_later(group):
+    group.is_deleted = True
+    group.save(update_fields=['is_deleted'])
+    hide_images({'group_id': group.pk})
+    transaction.on_commit(
+        lambda: enqueue(PURGE_GROUP_JOB, group.pk),
+        using=router.db_for_write(Group)
+    )
+
+
+def purge_user(user_id):
+    # Удаление могли отменить, пока задача ждала: строку UserDeletion
+    # удалили в админке
+    user = User.objects.filter(pk=user_id, deletion__isnull=False).first()
+    if user is None:
+        return
+    delete_authors_content([user_id])
+    delete_follows(user_id)
+    user.delete()
+
+
+def purge_group(group_id):
+    group = Group.objects.filter(pk=group_id, is_deleted=True).first()
+    if group is None:
+        return
+    delete_posts({'group_id': group_id})
+    group.delete()
@@ -0,0 +1,53 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import router, transaction
+
+from .models import Follow
+
+FOLLOWING_TIMEOUT = 60 * 60
+
+
+def _version_key(user_id):
+    return f'posts:following_version:{user_id}'
+
+
+def _get_version(user_id):
+    return cache.get_or_set(_version_key(user_id), uuid4().hex, None)
+
+
+def _ids_key(user_id, version):
+    return f'posts:following:{user_id}:{version}'
+
+
+def get_following_ids(user):
+    """Множество id авторов, на которых подписан пользователь."""
+    if not user.is_authenticated:
+        return frozenset()
+    ids = getattr(user, '_following_ids', None)
+    if ids is None:
+        key = _ids_key(user.pk, _get_version(user.pk))
+        ids = cache.get(key)
+        if ids is None:
+            ids = set(Follow.objects.filter(
+                user_id=user.pk
+            ).values_list('author_id', flat=True))
+            cache.set(key, ids, FOLLOWING_TIMEOUT)
+        user._following_ids = ids
+    return ids
+
+
+def _bump_version(user_id):
+    cache.set(_version_key(user_id), uuid4().hex, None)
+
+
+def invalidate_following(user_id):
+    """
+    Сбрасывает кэш подписок пользователя сразу и ещё раз после коммита:
+    запрос, прочитавший подписки до коммита, мог успеть положить в кэш
+    старое множество под новой версией.
+    """
+    _bump_version(user_id)
+    transaction.on_commit(
+        lambda: _bump_version(user_id), using=router.db_for_write(Follow)
+    )
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+from django.utils import timezone
+
+from core.db import delete_rows
+from posts.models import ArchivedPost, Post
+from posts.utils import ARCHIVE_VERSION_KEY
+
+ARCHIVED_FIELDS = ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image')
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты старше --days дней в архив (ArchivedPost) '
+        'пачками по --batch-size.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.POST_ARCHIVE_AGE_DAYS
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        using = router.db_for_write(Post)
+        # Пачка читается из основной базы внутри транзакции: реплика может
+        # ещё отдавать посты, которые уже перенесены
+        old_posts = Post.objects.using(using).filter(
+            pub_date__lt=cutoff
+        ).order_by('pk')
+        archived = 0
+        while True:
+            with transaction.atomic(using=using):
+                batch = list(
+                    old_posts.values(*ARCHIVED_FIELDS)[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                ArchivedPost.objects.using(using).bulk_create(
+                    (ArchivedPost(**fields) for fields in batch),
+                    ignore_conflicts=True
+                )
+                # Без каскада: комментарии остаются привязаны к тому же id
+                delete_rows(
+                    Post, [fields['id'] for fields in batch], using=using
+                )
+            archived += len(batch)
+            self.stdout.write(f'В архиве {archived} постов')
+        if archived:
+            cache.set(ARCHIVE_VERSION_KEY, timezone.now().timestamp(), None)
+        self.stdout.write(self.style.SUCCESS(f'Перенесено: {archived}'))
@@ -0,0 +1,95 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts.graph import FollowGraph, pagerank
+from posts.models import AuthorRank
+
+WRITE_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает PageRank авторов по графу подписок и сохраняет в '
+        'AuthorRank. Начинает с прошлых оценок и перезаписывает только '
+        'изменившиеся строки, поэтому подходит для ежедневного запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--damping', type=float, default=0.85)
+        parser.add_argument('--tol', type=float, default=1e-6)
+        parser.add_argument('--max-iter', type=int, default=100)
+        parser.add_argument(
+            '--min-change', type=float, default=0.01,
+            help='Относительное изменение оценки, при котором строка '
+                 'перезаписывается.'
+        )
+
+    def handle(self, *args, **options):
+        graph = FollowGraph.load()
+        stored_ids, stored_scores, stored_followers = self.load_ranks()
+        index = graph.index_of(stored_ids)
+        known = index >= 0
+        initial = None
+        if graph.size and known.any():
+            initial = np.full(graph.size, stored_scores[known].mean())
+            initial[index[known]] = stored_scores[known]
+        scores, iterations = pagerank(
+            graph, options['damping'], options['tol'], options['max_iter'],
+            initial
+        )
+        followers = np.bincount(graph.indices, minlength=graph.size)
+
+        previous = np.full(graph.size, np.nan)
+        previous[index[known]] = stored_scores[known]
+        previous_followers = np.full(graph.size, -1)
+        previous_followers[index[known]] = stored_followers[known]
+        changed = np.isnan(previous) | (followers != previous_followers) | (
+            np.abs(scores - previous)
+            > options['min_change'] * np.maximum(previous, 1e-12)
+        )
+        now = timezone.now()
+        created = updated = 0
+        for start in range(0, graph.size, WRITE_BATCH_SIZE):
+            batch = np.flatnonzero(changed[start:start + WRITE_BATCH_SIZE])
+            batch += start
+            ranks = [
+                AuthorRank(author_id=author, score=score, followers=count,
+                           computed=now)
+                for author, score, count in zip(
+                    graph.ids[batch].tolist(), scores[batch].tolist(),
+                    followers[batch].tolist()
+                )
+            ]
+            new = np.isnan(previous[batch])
+            with transaction.atomic():
+                AuthorRank.objects.bulk_create(
+                    rank for rank, is_new in zip(ranks, new) if is_new
+                )
+                AuthorRank.objects.bulk_update(
+                    [rank for rank, is_new in zip(ranks, new) if not is_new],
+                    ['score', 'followers', 'computed']
+                )
+            created += int(new.sum())
+            updated += int((~new).sum())
+        removed = stored_ids[~known].tolist()
+        for start in range(0, len(removed), WRITE_BATCH_SIZE):
+            AuthorRank.objects.filter(
+                author_id__in=removed[start:start + WRITE_BATCH_SIZE]
+            ).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Итераций: {iterations}, новых: {created}, '
+            f'обновлено: {updated}, удалено: {len(removed)}'
+        ))
+
+    def load_ranks(self):
+        rows = list(AuthorRank.objects.values_list(
+            'author_id', 'score', 'followers'
+        ))
+        if not rows:
+            return (np.empty(0, dtype=np.int64), np.empty(0),
+                    np.empty(0, dtype=np.int64))
+        ids, scores, followers = zip(*rows)
+        return (np.array(ids, dtype=np.int64), np.array(scores),
+                np.array(followers, dtype=np.int64))
@@ -0,0 +1,78 @@
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from core.storage import ShardedFileSystemStorage, sharded_name
+from posts.models import ArchivedPost, Post
+from posts.moderation import invalidate_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Раскладывает картинки постов из плоского каталога posts/ '
+        'по подкаталогам (core.storage.ShardedFileSystemStorage) пачками '
+        'по --batch-size, без остановки сайта. Можно прервать и запустить '
+        'снова. Миниатюры старых имён удаляет python manage.py '
+        'thumbnail cleanup, когда истечёт кэш страниц.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Пауза между пачками в секундах, чтобы не занимать диск.'
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ShardedFileSystemStorage):
+            raise CommandError(
+                'DEFAULT_FILE_STORAGE должен быть '
+                'core.storage.ShardedFileSystemStorage.'
+            )
+        for model in (Post, ArchivedPost):
+            moved, missing = self.shard(model, options)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.model_name}: перенесено {moved}, '
+                f'файлов не найдено {missing}'
+            ))
+
+    def shard(self, model, options):
+        rows = model.objects.exclude(image='').order_by('pk')
+        moved = missing = 0
+        last = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last).values_list(
+                'pk', 'image'
+            )[:options['batch_size']])
+            if not batch:
+                return moved, missing
+            moved_batch = []
+            for pk, name in batch:
+                if sharded_name(name) == name:
+                    continue
+                if not default_storage.exists(name):
+                    missing += 1
+                    continue
+                if self.move(model, pk, name):
+                    moved_batch.append((pk, name))
+            # UPDATE прошёл без сигналов: сбрасываем теги страниц с этими
+            # постами и только потом удаляем старые файлы, на которые
+            # ссылались закэшированные страницы
+            if moved_batch:
+                invalidate_posts(model, [pk for pk, _ in moved_batch])
+            for _, name in moved_batch:
+                default_storage.delete(name)
+            moved += len(moved_batch)
+            last = batch[-1][0]
+            self.stdout.write(f'{model._meta.model_name}: перенесено {moved}')
+            time.sleep(options['sleep'])
+
+    def move(self, model, pk, name):
+        # Старый файл остаётся до сброса тегов, страницы ссылаются на него
+        target = default_storage.link(name, sharded_name(name))
+        if model.objects.filter(pk=pk, image=name).update(image=target):
+            return True
+        # Картинку поста успели сменить: копия не нужна
+        default_storage.delete(target)
+        return False
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from posts.graph import FollowGraph, top_k
+from posts.models import Post, SuggestedAuthor
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает рекомендации "на кого подписаться": авторы, на которых '
+        'подписаны ваши подписки, с весом по числу общих подписок и '
+        'активности автора. Сохраняет --top лучших для каждого пользователя.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=settings.SUGGESTED_AUTHORS_LIMIT
+        )
+        parser.add_argument('--activity-days', type=int, default=30)
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько пользователей обрабатывать за один шаг.'
+        )
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        graph = FollowGraph.load()
+        activity = self.author_activity(graph, options['activity_days'])
+        saved = 0
+        for start in range(0, graph.size, options['chunk_size']):
+            stop = min(start + options['chunk_size'], graph.size)
+            users, authors, overlap = graph.friends_of_friends(start, stop)
+            scores = overlap * (1 + np.log1p(activity[authors]))
+            best = top_k(users, scores, options['top'])
+            with transaction.atomic():
+                SuggestedAuthor.objects.filter(
+                    user_id__in=graph.ids[start:stop].tolist()
+                ).delete()
+                SuggestedAuthor.objects.bulk_create(
+                    SuggestedAuthor(
+                        user_id=user, author_id=author, score=score
+                    )
+                    for user, author, score in zip(
+                        graph.ids[users[best]].tolist(),
+                        graph.ids[authors[best]].tolist(),
+                        scores[best].tolist()
+                    )
+                )
+            saved += len(best)
+        # Пользователи, пропавшие из графа, остались со старыми строками
+        SuggestedAuthor.objects.filter(computed__lt=started).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {graph.size}, рекомендаций: {saved}'
+        ))
+
+    def author_activity(self, graph, days):
+        """Число постов каждого автора за последние days дней."""
+        activity = np.zeros(graph.size)
+        counts = Post.objects.filter(
+            pub_date__gte=timezone.now() - timedelta(days=days)
+        ).order_by().values_list('author_id').annotate(total=Count('id'))
+        if counts:
+            authors, totals = np.array(list(counts), dtype=np.int64).T
+            index = graph.index_of(authors)
+            activity[index[index >= 0]] = totals[index >= 0]
+        return activity
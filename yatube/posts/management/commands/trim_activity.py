@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import ActivityBucket
+from posts.trending import current_bucket
+
+
+class Command(BaseCommand):
+    help = 'Удаляет счётчики активности, вышедшие за окно трендов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = current_bucket() - settings.TRENDING_WINDOW_HOURS + 1
+        stale = ActivityBucket.objects.filter(bucket__lt=start)
+        deleted = 0
+        while True:
+            batch = list(
+                stale.values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            ActivityBucket.objects.filter(pk__in=batch).delete()
+            deleted += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Удалено счётчиков: {deleted}'))
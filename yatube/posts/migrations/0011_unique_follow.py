@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:55
+
+from django.db import migrations, models
+from django.db.models import Min
+
+BATCH_SIZE = 1000
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    follows = Follow.objects.using(schema_editor.connection.alias)
+    first_ids = follows.values('user_id', 'author_id').annotate(
+        first_id=Min('id')
+    ).values('first_id')
+    duplicates = follows.exclude(id__in=first_ids)
+    while True:
+        batch = list(duplicates.values_list('id', flat=True)[:BATCH_SIZE])
+        if not batch:
+            break
+        follows.filter(id__in=batch).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_archivedpost'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_follows,
+            migrations.RunPython.noop,
+            hints={'model_name': 'follow'},
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0012_suggestedauthor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorRank',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('score', models.FloatField(db_index=True)),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('computed', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-score'],
+            },
+        ),
+    ]
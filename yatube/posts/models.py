@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Q
+
+from core.db import delete_rows
 
 User = get_user_model()
 
@@ -8,17 +11,44 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    # Группа удаляется в фоне (posts.deletion), до конца удаления её
+    # страница и посты скрыты
+    is_deleted = models.BooleanField(default=False, editable=False)
 
     def __str__(self) -> str:
         return self.title
 
 
+class UserDeletion(models.Model):
+    """
+    Пользователь, которого удаляет фоновая задача (posts.deletion).
+    Пока строка есть, его профиль и посты скрыты. Отдельная модель,
+    а не is_active: деактивированные аккаунты видны как раньше.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='deletion'
+    )
+    requested = models.DateTimeField(auto_now_add=True)
+
+
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        """Без постов пользователей и групп, которые удаляются в фоне."""
+        return self.filter(
+            Q(group=None) | Q(group__is_deleted=False),
+            author__deletion=None
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Введите текст поста'
     )
-    pub_date = models.DateTimeField(auto_now_add=True)
+    pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -38,9 +68,16 @@ class Post(models.Model):
     image = models.ImageField(
         upload_to='posts/',
         blank=True,
+        db_index=True,
         verbose_name='Картинка',
         help_text='Картинка поста'
     )
+    # Номер правки: защищает от затирания одновременных изменений
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    is_archived = False
 
     class Meta:
         ordering = ['-pub_date']
@@ -50,17 +87,78 @@ class Post(models.Model):
     def __str__(self):
         return self.text[:15]
 
+    def save_changes(self, fields, version):
+        """
+        Записывает только fields, если пост не менялся с правки version.
+        Возвращает False, если его уже изменил кто-то другой.
+        """
+        with transaction.atomic(using=router.db_for_write(Post)):
+            if not Post.objects.filter(pk=self.pk, version=version).update(
+                version=version + 1
+            ):
+                return False
+            self.version = version + 1
+            self.save(update_fields=fields)
+        return True
+
+
+class ArchivedPost(models.Model):
+    """
+    Посты старше settings.POST_ARCHIVE_AGE_DAYS (команда archive_posts).
+    id совпадает с id исходного поста, комментарии остаются привязаны к нему.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(verbose_name='Текст поста')
+    pub_date = models.DateTimeField(db_index=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='archived_posts'
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        verbose_name='Группа',
+        related_name='archived_posts'
+    )
+    image = models.ImageField(
+        upload_to='posts/',
+        blank=True,
+        db_index=True,
+        verbose_name='Картинка'
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    is_archived = True
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+
+    def __str__(self):
+        return self.text[:15]
+
 
+# Comment и Follow могут лежать в отдельных базах
+# (settings.DATABASE_TABLE_ROUTES), поэтому внешние ключи
+# без ограничений на уровне базы.
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
-        related_name='comments'
+        related_name='comments',
+        db_constraint=False
     )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='comments'
+        related_name='comments',
+        db_constraint=False
     )
     text = models.TextField(
         verbose_name='Текст комментария',
@@ -69,14 +167,113 @@ class Comment(models.Model):
     created = models.DateTimeField(auto_now_add=True)
 
 
+class FollowManager(models.Manager):
+    # Сигналы моделей здесь не срабатывают, кэш подписок сбрасывается
+    # явно. follow_cache сам импортирует модели, поэтому импорт здесь
+
+    def follow(self, user, author):
+        """
+        Подписка одним INSERT ... ON CONFLICT DO NOTHING,
+        повторная подписка ничего не меняет.
+        """
+        from .follow_cache import invalidate_following
+        self.bulk_create(
+            [self.model(user_id=user.pk, author_id=author.pk)],
+            ignore_conflicts=True
+        )
+        invalidate_following(user.pk)
+
+    def unfollow(self, user, author):
+        """Отписка одним DELETE, без предварительного SELECT."""
+        from .follow_cache import invalidate_following
+        delete_rows(
+            self.model, [author.pk], field='author',
+            using=router.db_for_write(self.model), user=user.pk
+        )
+        invalidate_following(user.pk)
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='follower'
+        related_name='follower',
+        db_constraint=False
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        db_constraint=False
+    )
+
+    objects = FollowManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
+
+class SuggestedAuthor(models.Model):
+    """Рекомендации авторов, которые считает команда suggest_authors."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggested_authors',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='following'
+        related_name='+'
     )
+    score = models.FloatField()
+    computed = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [models.Index(fields=['user', '-score'])]
+
+
+class AuthorRank(models.Model):
+    """Влиятельность автора по графу подписок (команда rank_authors)."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank'
+    )
+    score = models.FloatField(db_index=True)
+    followers = models.PositiveIntegerField(default=0)
+    computed = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-score']
+
+
+class ActivityBucket(models.Model):
+    """
+    Счётчик активности объекта за один час (bucket - номер часа
+    от начала эпохи). Тренды считаются суммой последних корзин.
+    """
+    POST = 'post'
+    GROUP = 'group'
+    KIND_CHOICES = (
+        (POST, 'Пост'),
+        (GROUP, 'Группа'),
+    )
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    bucket = models.PositiveIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'bucket', 'object_id'],
+                name='unique_activity_bucket'
+            ),
+        ]
@@ -0,0 +1,148 @@
+"""
+Массовая модерация: перенос и удаление постов и комментариев
+пачками по BATCH_SIZE строк отдельными UPDATE/DELETE, без загрузки
+объектов и сигналов на каждую строку, поэтому теги кэша страниц
+сбрасываются здесь же. Функции принимают фильтры в виде словаря
+или списка словарей, соединённых через AND, чтобы их можно было
+поставить в очередь задач.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import router
+from django.utils import timezone
+
+from core.db import delete_rows
+from core.tagged_cache import invalidate_tags
+
+from .follow_cache import invalidate_following
+from .models import ArchivedPost, Comment, Follow, Post
+from .tasks import delete_images
+from .utils import (ARCHIVE_VERSION_KEY, author_tag, group_tags,
+                    post_tag)
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def _parts(filters):
+    return filters if isinstance(filters, list) else [filters]
+
+
+def filter_rows(model, filters):
+    """Строки model по словарю условий или списку словарей через AND."""
+    queryset = model.objects.all()
+    for part in _parts(filters):
+        queryset = queryset.filter(**part)
+    return queryset
+
+
+def _batches(model, filters, batch_size=BATCH_SIZE):
+    """id строк model по filters пачками по возрастанию, без OFFSET."""
+    parts = _parts(filters)
+    if len(parts) == 1 and set(parts[0]) == {'pk__in'}:
+        # Выбранные в админке id делим на пачки сами, чтобы не передавать
+        # весь список в каждом запросе
+        ids = sorted(parts[0]['pk__in'])
+        for start in range(0, len(ids), batch_size):
+            yield ids[start:start + batch_size]
+        return
+    queryset = filter_rows(model, filters)
+    last = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last).order_by('pk').values_list(
+            'pk', flat=True
+        )[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def invalidate_posts(model, ids, *group_ids):
+    """
+    Сбрасывает теги постов ids, их авторов и групп (до изменения).
+    Возвращает имена картинок постов.
+    """
+    rows = list(model.objects.filter(pk__in=ids).values_list(
+        'author_id', 'group_id', 'image'
+    ))
+    invalidate_tags(
+        *map(post_tag, ids),
+        *{author_tag(author_id) for author_id, _, _ in rows},
+        *group_tags(*(group_id for _, group_id, _ in rows), *group_ids)
+    )
+    return [image for _, _, image in rows if image]
+
+
+def move_posts(filters, group_id):
+    moved = 0
+    for ids in _batches(Post, filters):
+        invalidate_posts(Post, ids, group_id)
+        moved += Post.objects.filter(pk__in=ids).update(group_id=group_id)
+        logger.info('Перенесено постов: %s', moved)
+    return moved
+
+
+def _delete_posts(model, filters):
+    posts = comments = 0
+    using = router.db_for_write(model)
+    comments_using = router.db_for_write(Comment)
+    for ids in _batches(model, filters):
+        images = invalidate_posts(model, ids)
+        # Комментарии могут лежать в другой базе, удаляем их отдельно
+        comments += delete_rows(
+            Comment, ids, field='post', using=comments_using
+        )
+        posts += delete_rows(model, ids, using=using)
+        delete_images(images)
+        logger.info(
+            'Удалено из %s: постов %s, комментариев %s',
+            model._meta.model_name, posts, comments
+        )
+    return posts, comments
+
+
+def delete_posts(filters):
+    """Удаляет посты и архивные посты с комментариями и картинками."""
+    posts, comments = _delete_posts(Post, filters)
+    archived, archived_comments = _delete_posts(ArchivedPost, filters)
+    if archived:
+        cache.set(ARCHIVE_VERSION_KEY, timezone.now().timestamp(), None)
+    return posts + archived, comments + archived_comments
+
+
+def delete_comments(filters):
+    deleted = 0
+    using = router.db_for_write(Comment)
+    for ids in _batches(Comment, filters):
+        invalidate_tags(*map(post_tag, set(Comment.objects.filter(
+            pk__in=ids
+        ).values_list('post_id', flat=True))))
+        deleted += delete_rows(Comment, ids, using=using)
+        logger.info('Удалено комментариев: %s', deleted)
+    return deleted
+
+
+def delete_authors_content(author_ids):
+    """Удаляет все посты и комментарии авторов."""
+    posts, comments = delete_posts({'author_id__in': author_ids})
+    return posts, comments + delete_comments({'author_id__in': author_ids})
+
+
+def delete_follows(user_id):
+    """Удаляет подписки пользователя и подписки на него."""
+    deleted = 0
+    using = router.db_for_write(Follow)
+    for filters in ({'user_id': user_id}, {'author_id': user_id}):
+        for ids in _batches(Follow, filters):
+            followers = set(Follow.objects.filter(pk__in=ids).values_list(
+                'user_id', flat=True
+            ))
+            deleted += delete_rows(Follow, ids, using=using)
+            for follower in followers:
+                invalidate_following(follower)
+            logger.info('Удалено подписок: %s', deleted)
+    invalidate_tags(author_tag(user_id))
+    return deleted
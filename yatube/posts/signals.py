@@ -0,0 +1,181 @@
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.auth import invalidate_user
+from core.jobs import enqueue
+from core.tagged_cache import invalidate_tags
+
+from .follow_cache import invalidate_following
+from .models import (ActivityBucket, Comment, Follow, Group, Post,
+                     UserDeletion)
+from .trending import record_activity
+from .utils import (author_tag, authors_by_username, group_tag, group_tags,
+                    groups_by_slug, post_tag)
+
+User = get_user_model()
+
+# Поля пользователя, которые видны на страницах автора. Вход в систему
+# сохраняет только last_login, кэш при этом сбрасывать не нужно.
+AUTHOR_PAGE_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def shows_author(update_fields):
+    return update_fields is None or bool(AUTHOR_PAGE_FIELDS & update_fields)
+
+
+def stored_apart(model, parent):
+    return router.db_for_write(model) != router.db_for_write(parent)
+
+
+# Каскадное удаление Django не видит строки в других базах,
+# поэтому зависимые записи из вынесенных таблиц удаляем сами.
+@receiver(post_delete, sender=Post)
+def delete_post_comments(sender, instance, **kwargs):
+    if stored_apart(Comment, Post):
+        Comment.objects.filter(post_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=User)
+def delete_user_relations(sender, instance, **kwargs):
+    if stored_apart(Comment, User):
+        Comment.objects.filter(author_id=instance.pk).delete()
+    if stored_apart(Follow, User):
+        Follow.objects.filter(
+            Q(user_id=instance.pk) | Q(author_id=instance.pk)
+        ).delete()
+
+
+# id пользователей могут повторяться, новый пользователь
+# не должен получить закэшированные подписки прежнего
+@receiver(post_save, sender=User)
+def reset_following_cache(sender, instance, created, **kwargs):
+    if created:
+        invalidate_following(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def drop_following_cache(sender, instance, **kwargs):
+    invalidate_following(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def count_post_activity(sender, instance, created, **kwargs):
+    if created:
+        record_activity(ActivityBucket.POST, instance.pk)
+        if instance.group_id:
+            record_activity(ActivityBucket.GROUP, instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_activity(sender, instance, created, **kwargs):
+    if created:
+        record_activity(ActivityBucket.POST, instance.post_id)
+        # В add_comment пост уже загружен, иначе читаем только group_id
+        if Comment.post.is_cached(instance):
+            group_id = instance.post.group_id
+        else:
+            group_id = Post.objects.filter(
+                pk=instance.post_id
+            ).values_list('group_id', flat=True).first()
+        if group_id:
+            record_activity(ActivityBucket.GROUP, group_id)
+
+
+@receiver(post_save, sender=Post)
+def queue_thumbnail(sender, instance, created, update_fields, **kwargs):
+    # При правке миниатюра нужна, только если сменилась картинка
+    changed = created or update_fields and 'image' in update_fields
+    if changed and instance.image:
+        transaction.on_commit(
+            lambda: enqueue('posts.tasks.make_thumbnail', instance.pk)
+        )
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, update_fields, **kwargs):
+    # Пост мог уйти из другой группы, её страницу тоже нужно сбросить
+    if instance.pk and (update_fields is None or 'group' in update_fields):
+        instance._saved_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    invalidate_tags(
+        post_tag(instance.pk),
+        author_tag(instance.author_id),
+        *group_tags(
+            instance.group_id, getattr(instance, '_saved_group_id', None)
+        )
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    invalidate_tags(post_tag(instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    invalidate_tags(group_tag(instance.slug))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_pages(sender, instance, update_fields=None, **kwargs):
+    if shows_author(update_fields):
+        invalidate_tags(author_tag(instance.pk))
+
+
+# Слаг группы и имя пользователя могут смениться: сбрасываем и прежние
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    if instance.pk:
+        instance._saved_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_cached_group(sender, instance, **kwargs):
+    for slug in {instance.slug, getattr(instance, '_saved_slug', None)}:
+        if slug:
+            groups_by_slug.invalidate(slug)
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields, **kwargs):
+    if instance.pk and (update_fields is None or 'username' in update_fields):
+        instance._saved_username = User.objects.filter(
+            pk=instance.pk
+        ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_author(sender, instance, update_fields=None,
+                             **kwargs):
+    if not shows_author(update_fields):
+        return
+    for username in {
+        instance.username, getattr(instance, '_saved_username', None)
+    }:
+        if username:
+            authors_by_username.invalidate(username)
+
+
+@receiver(post_save, sender=UserDeletion)
+@receiver(post_delete, sender=UserDeletion)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    # Пользователь сессии закэширован вместе с UserDeletion
+    invalidate_user(instance.user_id)
+    invalidate_tags(author_tag(instance.user_id))
+    authors_by_username.invalidate(instance.user.username)
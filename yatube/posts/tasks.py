@@ -0,0 +1,29 @@
+from django.core.files.storage import default_storage
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+
+# Те же параметры, что у {% thumbnail %} в шаблонах ленты и поста
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def make_thumbnail(post_id):
+    """Готовит миниатюру заранее, чтобы её не считал первый читатель."""
+    post = Post.objects.visible().filter(pk=post_id).first()
+    if post and post.image:
+        get_thumbnail(post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+
+
+def delete_images(names):
+    """Удаляет картинки удалённых постов вместе с их миниатюрами."""
+    for name in names:
+        default.kvstore.delete(ImageFile(name, default_storage))
+        default_storage.delete(name)
+
+
+def delete_thumbnails(names):
+    """Удаляет миниатюры картинок, сами картинки остаются."""
+    for name in names:
+        default.kvstore.delete_thumbnails(ImageFile(name, default_storage))
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(PostAdminTests.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def create_posts(self, count):
+        authors = User.objects.bulk_create(
+            User(username=f'author{Post.objects.count()}_{i}')
+            for i in range(count)
+        )
+        Post.objects.bulk_create(
+            Post(author=author, group=PostAdminTests.group, text='Пост')
+            for author in User.objects.filter(
+                username__in=[author.username for author in authors]
+            )
+        )
+
+    def changelist_queries(self):
+        # первый запрос кладёт в кэш пользователя сессии и число постов
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка постов не зависит от числа строк."""
+        self.create_posts(2)
+        few = self.changelist_queries()
+        self.create_posts(20)
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_search_by_id(self):
+        """Поиск 'id:<число>' находит пост по id."""
+        self.create_posts(3)
+        post = Post.objects.first()
+        response = self.client.get(self.url, {'q': f'id:{post.pk}'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [post]
+        )
+
+    def test_search_number_in_text(self):
+        """Число без префикса ищется в тексте постов."""
+        self.create_posts(1)
+        post = Post.objects.create(
+            author=PostAdminTests.admin, text='Итоги 2021 года'
+        )
+        response = self.client.get(self.url, {'q': '2021'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [post]
+        )
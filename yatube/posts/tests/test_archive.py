@@ -0,0 +1,89 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import ArchivedPost, Comment, Post
+
+User = get_user_model()
+
+
+class ArchivePostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ArchivePostsTests.user)
+        posts = [Post(author=ArchivePostsTests.user, text=f'Пост {i}')
+                 for i in range(settings.ROW_LIMIT + 2)]
+        Post.objects.bulk_create(posts)
+        self.old_post = Post.objects.create(
+            author=ArchivePostsTests.user, text='Старый пост'
+        )
+        Post.objects.filter(pk=self.old_post.pk).update(
+            pub_date=timezone.now() - timedelta(
+                days=settings.POST_ARCHIVE_AGE_DAYS + 1
+            )
+        )
+        self.comment = Comment.objects.create(
+            post=self.old_post,
+            author=ArchivePostsTests.user,
+            text='Комментарий к старому посту'
+        )
+        call_command('archive_posts', stdout=StringIO())
+
+    def test_old_posts_moved_to_archive(self):
+        """Старые посты переносятся в архив вместе с id и комментариями."""
+        self.assertFalse(Post.objects.filter(pk=self.old_post.pk).exists())
+        archived = ArchivedPost.objects.get(pk=self.old_post.pk)
+        self.assertEqual(archived.text, self.old_post.text)
+        self.assertTrue(Comment.objects.filter(pk=self.comment.pk).exists())
+
+    def test_feed_continues_into_archive(self):
+        """Лента после горячих постов продолжается архивом."""
+        response = self.authorized_client.get(
+            reverse('posts:profile', args=(ArchivePostsTests.user.username,))
+        )
+        self.assertEqual(response.context['count'], Post.objects.count() + 1)
+        self.assertNotContains(response, self.old_post.text)
+        response = self.authorized_client.get(
+            reverse('posts:profile', args=(ArchivePostsTests.user.username,))
+            + '?page=2'
+        )
+        self.assertContains(response, self.old_post.text)
+
+    def test_archived_post_detail_is_read_only(self):
+        """Архивный пост открывается, но без редактирования и комментариев."""
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=(self.old_post.pk,))
+        )
+        self.assertContains(response, self.comment.text)
+        self.assertNotContains(response, 'редактировать запись')
+        self.assertNotContains(response, 'Добавить комментарий:')
+
+    def test_rerun_after_interrupted_batch(self):
+        """Повтор после прерванной пачки не падает на уже скопированных id."""
+        post = Post.objects.create(
+            author=ArchivePostsTests.user, text='Прерванный перенос'
+        )
+        pub_date = timezone.now() - timedelta(
+            days=settings.POST_ARCHIVE_AGE_DAYS + 1
+        )
+        Post.objects.filter(pk=post.pk).update(pub_date=pub_date)
+        ArchivedPost.objects.create(
+            id=post.pk, author=ArchivePostsTests.user,
+            text=post.text, pub_date=pub_date
+        )
+        call_command('archive_posts', stdout=StringIO())
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertEqual(ArchivedPost.objects.filter(pk=post.pk).count(), 1)
@@ -0,0 +1,181 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..deletion import purge_group, purge_user
+from ..follow_cache import get_following_ids
+from ..models import (ArchivedPost, Comment, Follow, Group, Post,
+                      UserDeletion)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BackgroundDeletionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(BackgroundDeletionTests.admin)
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(
+            author=self.author,
+            group=self.group,
+            text='Пост автора',
+            image=SimpleUploadedFile('deleted.gif', SMALL_GIF, 'image/gif'),
+        )
+        self.other = Post.objects.create(
+            author=BackgroundDeletionTests.reader, text='Пост читателя'
+        )
+        Comment.objects.create(
+            post=self.other, author=self.author, text='Комментарий'
+        )
+        Follow.objects.create(
+            user=BackgroundDeletionTests.reader, author=self.author
+        )
+
+    def index_posts(self):
+        return list(self.client.get(reverse('posts:index')).context[
+            'page_obj'
+        ])
+
+    def test_deleted_user_hidden_at_once(self):
+        """Удалённый в админке пользователь сразу скрыт, строки остаются."""
+        response = self.client.post(
+            reverse('admin:auth_user_delete', args=(self.author.pk,)),
+            {'post': 'yes'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(UserDeletion.objects.filter(user=self.author).exists())
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertEqual(self.index_posts(), [self.other])
+        response = self.client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_deleted_user_thumbnails_removed(self):
+        """Миниатюры картинок скрытых постов удаляются сразу."""
+        names = []
+        with mock.patch(
+            'posts.deletion.delete_thumbnails', side_effect=names.extend
+        ):
+            self.client.post(
+                reverse('admin:auth_user_delete', args=(self.author.pk,)),
+                {'post': 'yes'}
+            )
+        self.assertEqual(names, [self.post.image.name])
+        self.assertTrue(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, self.post.image.name))
+        )
+
+    def test_delete_confirmation_does_not_collect_cascade(self):
+        """Страница подтверждения не перечисляет посты пользователя."""
+        response = self.client.get(
+            reverse('admin:auth_user_delete', args=(self.author.pk,))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Пост автора')
+
+    def test_purge_user(self):
+        """Задача удаляет посты, комментарии, подписки и картинки автора."""
+        ArchivedPost.objects.create(
+            id=self.post.pk + 100, author=self.author,
+            text='Архив', pub_date=self.post.pub_date
+        )
+        image = os.path.join(TEMP_MEDIA_ROOT, self.post.image.name)
+        self.assertIn(self.author.pk, get_following_ids(
+            User.objects.get(pk=BackgroundDeletionTests.reader.pk)
+        ))
+        UserDeletion.objects.create(user=self.author)
+        with self.assertLogs('posts.moderation'):
+            purge_user(self.author.pk)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.other])
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(os.path.exists(image))
+        self.assertNotIn(self.author.pk, get_following_ids(
+            User.objects.get(pk=BackgroundDeletionTests.reader.pk)
+        ))
+
+    def test_purge_skips_cancelled_deletion(self):
+        """Пользователь, удаление которого отменили, не удаляется."""
+        purge_user(self.author.pk)
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
+
+    def test_deactivated_user_stays_visible(self):
+        """Деактивированный пользователь не считается удаляемым."""
+        self.author.is_active = False
+        self.author.save()
+        self.assertIn(self.post, self.index_posts())
+        response = self.client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete_needs_cascade_permissions(self):
+        """Без права удалять посты пользователя удалить нельзя."""
+        moderator = User.objects.create_user(
+            username='moderator', password='pass', is_staff=True
+        )
+        moderator.user_permissions.add(*Permission.objects.filter(
+            codename__in=('view_user', 'delete_user')
+        ))
+        self.client.force_login(moderator)
+        response = self.client.post(
+            reverse('admin:auth_user_delete', args=(self.author.pk,)),
+            {'post': 'yes'}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(UserDeletion.objects.exists())
+
+    def test_deleted_group_hidden_and_purged(self):
+        """Группа сразу скрыта, а задача удаляет её посты и её саму."""
+        self.client.post(
+            reverse('admin:posts_group_delete', args=(self.group.pk,)),
+            {'post': 'yes'}
+        )
+        self.assertEqual(self.index_posts(), [self.other])
+        response = self.client.get(
+            reverse('posts:group_list', args=(self.group.slug,))
+        )
+        self.assertEqual(response.status_code, 404)
+        with self.assertLogs('posts.moderation'):
+            purge_group(self.group.pk)
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(list(Post.objects.all()), [self.other])
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
@@ -5,9 +5,13 @@ from http import HTTPStatus
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from core.storage import sharded_name
+
 from ..models import Comment, Group, Post
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -102,7 +106,7 @@ class PostFormTests(TestCase):
             Post.objects.filter(
                 text=form_data['text'],
                 group=PostFormTests.group,
-                image='posts/' + form_data['image'].name
+                image=sharded_name('posts/' + form_data['image'].name)
             ).exists()
         )
 
@@ -132,6 +136,65 @@ class PostFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group, group)
 
+    def edit(self, post, **data):
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized_client.post(
+                reverse('posts:post_edit', args=(post.pk,)),
+                data={'text': post.text, 'group': post.group_id or '', **data}
+            )
+        updates = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ]
+        return response, updates
+
+    def test_edit_without_changes_is_not_saved(self):
+        """Правка без изменений не пишет в базу."""
+        post = Post.objects.create(author=PostFormTests.user, text='Пост')
+        response, updates = self.edit(post, version=post.version)
+        self.assertRedirects(response, reverse(
+            'posts:post_detail', args=(post.pk,)
+        ))
+        self.assertEqual(updates, [])
+
+    def test_edit_saves_only_changed_fields(self):
+        """Правка пишет только изменённые поля и новую версию."""
+        post = Post.objects.create(author=PostFormTests.user, text='Пост')
+        response, updates = self.edit(
+            post, text='Новый текст', version=post.version
+        )
+        self.assertNotIn('"group_id"', ''.join(updates))
+        self.assertNotIn('"pub_date"', ''.join(updates))
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertEqual(post.version, 1)
+
+    def test_edit_saves_new_image(self):
+        """Новая картинка при правке сохраняется."""
+        post = Post.objects.create(author=PostFormTests.user, text='Пост')
+        self.edit(post, image=SimpleUploadedFile(
+            name='edit.gif',
+            content=(
+                b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00'
+                b'\x21\xF9\x04\x01\x00\x00\x00\x00\x2C\x00\x00\x00\x00'
+                b'\x01\x00\x01\x00\x00\x02\x01\x00\x00\x3B'
+            ),
+            content_type='image/gif'
+        ))
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, sharded_name('posts/edit.gif'))
+
+    def test_edit_of_stale_version_is_rejected(self):
+        """Правка устаревшей версии не затирает чужие изменения."""
+        post = Post.objects.create(author=PostFormTests.user, text='Пост')
+        Post.objects.filter(pk=post.pk).update(text='Чужая правка', version=1)
+        response, updates = self.edit(post, text='Моя правка', version=0)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['version'], 1)
+        self.assertTrue(response.context['form'].non_field_errors())
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Чужая правка')
+
     def test_add_comment(self):
         """После успешной отправки комментарий появляется на странице поста."""
         comments_count = Comment.objects.count()
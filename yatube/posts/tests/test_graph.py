@@ -0,0 +1,99 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorRank, Follow, Post, SuggestedAuthor
+
+User = get_user_model()
+
+
+class SuggestAuthorsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.friend, cls.active, cls.quiet = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'active', 'quiet')
+        )
+        for user, author in ((cls.reader, cls.friend),
+                             (cls.friend, cls.reader),
+                             (cls.friend, cls.active),
+                             (cls.friend, cls.quiet)):
+            Follow.objects.create(user=user, author=author)
+        Post.objects.bulk_create(
+            Post(author=cls.active, text=f'Пост {i}') for i in range(3)
+        )
+
+    def setUp(self):
+        call_command('suggest_authors', stdout=StringIO())
+
+    def test_friends_of_friends_ranked_by_activity(self):
+        """Рекомендуются подписки подписок, активные авторы выше."""
+        suggested = list(SuggestedAuthor.objects.filter(
+            user=SuggestAuthorsTests.reader
+        ).values_list('author', flat=True))
+        self.assertEqual(
+            suggested,
+            [SuggestAuthorsTests.active.pk, SuggestAuthorsTests.quiet.pk]
+        )
+
+    def test_followed_and_self_not_suggested(self):
+        """Не рекомендуются уже отслеживаемые авторы и сам пользователь."""
+        self.assertFalse(SuggestedAuthor.objects.filter(
+            user=SuggestAuthorsTests.friend
+        ).exists())
+
+    def test_follow_page_shows_suggestions(self):
+        """Лента подписок показывает рекомендации."""
+        client = Client()
+        client.force_login(SuggestAuthorsTests.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['suggested_authors']), 2)
+        self.assertContains(response, 'Рекомендуемые авторы')
+
+
+class RankAuthorsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.star, cls.fan, cls.reader, cls.newbie = (
+            User.objects.create_user(username=name)
+            for name in ('star', 'fan', 'reader', 'newbie')
+        )
+        for user, author in ((cls.fan, cls.star),
+                             (cls.reader, cls.star),
+                             (cls.newbie, cls.star),
+                             (cls.star, cls.fan),
+                             (cls.reader, cls.newbie)):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        call_command('rank_authors', stdout=StringIO())
+
+    def test_most_followed_author_ranks_first(self):
+        """Автор с влиятельными подписчиками выше в рейтинге."""
+        ranks = list(AuthorRank.objects.values_list('author', 'followers'))
+        self.assertEqual(ranks[0], (RankAuthorsTests.star.pk, 3))
+        self.assertEqual(ranks[1][0], RankAuthorsTests.fan.pk)
+        self.assertAlmostEqual(
+            sum(AuthorRank.objects.values_list('score', flat=True)), 1
+        )
+
+    def test_rerun_without_changes_writes_nothing(self):
+        """Повторный запуск без изменений графа ничего не перезаписывает."""
+        out = StringIO()
+        call_command('rank_authors', stdout=out)
+        self.assertIn('новых: 0, обновлено: 0, удалено: 0', out.getvalue())
+
+    def test_top_authors_page(self):
+        """Страница рейтинга показывает авторов по порядку."""
+        response = Client().get(reverse('posts:top_authors'))
+        self.assertTemplateUsed(response, 'posts/top_authors.html')
+        self.assertEqual(
+            response.context['ranks'][0].author, RankAuthorsTests.star
+        )
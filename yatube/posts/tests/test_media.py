@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.storage import sharded_name
+from core.tagged_cache import tag_versions
+
+from ..models import ArchivedPost, Post
+from ..utils import post_tag
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ShardedMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def flat_post(self, name, model=Post, **fields):
+        """Пост с картинкой в старом плоском каталоге posts/."""
+        path = os.path.join(TEMP_MEDIA_ROOT, 'posts', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as image:
+            image.write(name.encode())
+        return model.objects.create(
+            author=ShardedMediaTests.user, text='Пост',
+            image=f'posts/{name}', **fields
+        )
+
+    def test_sharded_name(self):
+        """Имя раскладывается по двум уровням каталогов один раз."""
+        name = sharded_name('posts/photo.jpg')
+        self.assertRegex(name, r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/photo.jpg$')
+        self.assertEqual(sharded_name(name), name)
+        # суффикс от get_available_name не меняет подкаталог
+        suffixed = name.replace('photo.jpg', 'photo_07KGtee.jpg')
+        self.assertEqual(sharded_name(suffixed), suffixed)
+
+    def test_upload_saved_to_shard(self):
+        """Новая картинка сохраняется в подкаталог."""
+        post = Post.objects.create(author=ShardedMediaTests.user, text='Пост')
+        post.image.save('new.gif', ContentFile(b'gif'))
+        self.assertEqual(post.image.name, sharded_name('posts/new.gif'))
+        self.assertTrue(default_storage.exists(post.image.name))
+
+    def test_shard_media_moves_files_and_paths(self):
+        """Команда переносит файлы и пути, сбрасывает кэш страниц постов."""
+        post = self.flat_post('old.gif')
+        archived = self.flat_post(
+            'archived.gif', ArchivedPost, id=post.pk + 1,
+            pub_date=post.pub_date
+        )
+        tags = [post_tag(post.pk), post_tag(archived.pk)]
+        versions = tag_versions(tags)
+        call_command('shard_media', stdout=StringIO())
+        new_versions = tag_versions(tags)
+        for old, new in zip(versions, new_versions):
+            self.assertNotEqual(old, new)
+        for obj in (post, archived):
+            old = obj.image.name
+            obj.refresh_from_db()
+            with self.subTest(name=old):
+                self.assertEqual(obj.image.name, sharded_name(old))
+                self.assertFalse(default_storage.exists(old))
+                with default_storage.open(obj.image.name) as image:
+                    self.assertEqual(
+                        image.read(), os.path.basename(old).encode()
+                    )
+        call_command('shard_media', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, sharded_name('posts/old.gif'))
+
+    def test_shard_media_keeps_collided_names(self):
+        """Имя с суффиксом внутри подкаталога не переносится глубже."""
+        shard = os.path.dirname(sharded_name('posts/image.gif'))
+        name = f'{shard}/image_07KGtee.gif'
+        post = self.flat_post(name[len('posts/'):])
+        for _ in range(2):
+            call_command('shard_media', stdout=StringIO())
+            post.refresh_from_db()
+            self.assertEqual(post.image.name, name)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_shard_media_keeps_changed_rows(self):
+        """Если картинку сменили во время переноса, строка не затирается."""
+        post = self.flat_post('race.gif')
+        original_link = default_storage.link
+
+        def link_and_change(name, target):
+            Post.objects.filter(pk=post.pk).update(image='posts/other.gif')
+            return original_link(name, target)
+
+        with mock.patch.object(
+            default_storage, 'link', side_effect=link_and_change
+        ):
+            call_command('shard_media', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, 'posts/other.gif')
+        self.assertFalse(
+            default_storage.exists(sharded_name('posts/race.gif'))
+        )
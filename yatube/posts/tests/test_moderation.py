@@ -0,0 +1,167 @@
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.jobs import call
+from core.models import Job
+
+from ..models import ArchivedPost, Comment, Group, Post
+
+User = get_user_model()
+
+
+class ModerationActionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.spammer = User.objects.create_user(username='spammer')
+        cls.user = User.objects.create_user(username='user')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other = Group.objects.create(title='Другая', slug='other')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(ModerationActionsTests.admin)
+        self.spam = Post.objects.create(
+            author=ModerationActionsTests.spammer,
+            group=ModerationActionsTests.group,
+            text='Купите слонов',
+        )
+        self.post = Post.objects.create(
+            author=ModerationActionsTests.user,
+            group=ModerationActionsTests.group,
+            text='Обычный пост',
+        )
+        self.comment = Comment.objects.create(
+            post=self.post, author=ModerationActionsTests.spammer,
+            text='Слоны недорого'
+        )
+        Comment.objects.create(
+            post=self.spam, author=ModerationActionsTests.user, text='Ответ'
+        )
+
+    def act(self, model, action, ids, query='', **data):
+        return self.client.post(
+            reverse(f'admin:posts_{model}_changelist') + query,
+            {'action': action, 'index': 0,
+             helpers.ACTION_CHECKBOX_NAME: ids, **data},
+            follow=True
+        )
+
+    def test_action_asks_for_confirmation(self):
+        """Действие сначала показывает форму и ничего не меняет."""
+        response = self.act('post', 'move_to_group', [self.spam.pk])
+        self.assertTemplateUsed(response, 'admin/posts/moderation_form.html')
+        self.spam.refresh_from_db()
+        self.assertEqual(self.spam.group, ModerationActionsTests.group)
+
+    def test_move_to_group(self):
+        """Выбранные посты переносятся в группу."""
+        with self.assertLogs('posts.moderation'):
+            response = self.act(
+                'post', 'move_to_group', [self.spam.pk],
+                apply=1, group=ModerationActionsTests.other.pk
+            )
+        self.assertContains(response, 'Перенесено постов: 1')
+        self.assertEqual(
+            Post.objects.get(pk=self.spam.pk).group,
+            ModerationActionsTests.other
+        )
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).group,
+            ModerationActionsTests.group
+        )
+
+    def test_move_group_posts(self):
+        """Посты выбранных групп переносятся в другую группу."""
+        with self.assertLogs('posts.moderation'):
+            self.act(
+                'group', 'move_posts', [ModerationActionsTests.group.pk],
+                apply=1, group=ModerationActionsTests.other.pk
+            )
+        self.assertFalse(
+            Post.objects.filter(group=ModerationActionsTests.group).exists()
+        )
+
+    def test_delete_authors_content(self):
+        """Удаляются все посты, архивные посты и комментарии автора."""
+        ArchivedPost.objects.create(
+            id=self.spam.pk + 100, author=ModerationActionsTests.spammer,
+            text='Старый спам', pub_date=timezone.now()
+        )
+        with self.assertLogs('posts.moderation'):
+            response = self.act(
+                'post', 'delete_authors_content', [self.spam.pk], apply=1
+            )
+        self.assertContains(response, 'Удалено постов: 2, комментариев: 2')
+        self.assertFalse(Post.objects.filter(pk=self.spam.pk).exists())
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertEqual(list(Comment.objects.all()), [])
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_delete_comment_authors_content(self):
+        """Действие над комментарием удаляет всё его автора."""
+        with self.assertLogs('posts.moderation'):
+            self.act(
+                'comment', 'delete_authors_content', [self.comment.pk],
+                apply=1
+            )
+        self.assertFalse(
+            Post.objects.filter(author=ModerationActionsTests.spammer).exists()
+        )
+        self.assertFalse(Comment.objects.filter(pk=self.comment.pk).exists())
+
+    def test_delete_by_pattern(self):
+        """Из выбранных удаляются посты с текстом, содержащим строку."""
+        with self.assertLogs('posts.moderation'):
+            response = self.act(
+                'post', 'delete_by_pattern', [self.spam.pk, self.post.pk],
+                apply=1, pattern='СЛОНОВ'
+            )
+        self.assertContains(response, 'Удалено постов: 1, комментариев: 1')
+        self.assertEqual(list(Post.objects.all()), [self.post])
+
+    def test_delete_by_pattern_keeps_unselected(self):
+        """Посты вне выбора не удаляются, даже если текст подходит."""
+        self.act(
+            'post', 'delete_by_pattern', [self.post.pk],
+            apply=1, pattern='слонов'
+        )
+        self.assertTrue(Post.objects.filter(pk=self.spam.pk).exists())
+
+    @override_settings(MODERATION_SYNC_LIMIT=0)
+    def test_select_across_passes_changelist_filters(self):
+        """Для всех строк списка в задачу уходят условия поиска, а не id."""
+        self.act(
+            'post', 'move_to_group', [self.spam.pk], query='?q=Купите',
+            select_across=1, apply=1, group=ModerationActionsTests.other.pk
+        )
+        job = Job.objects.get()
+        self.assertNotIn('pk__in', job.payload)
+        with self.assertLogs('posts.moderation'):
+            call(job.name, job.payload)
+        self.assertEqual(
+            Post.objects.get(pk=self.spam.pk).group,
+            ModerationActionsTests.other
+        )
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).group,
+            ModerationActionsTests.group
+        )
+
+    @override_settings(MODERATION_SYNC_LIMIT=1)
+    def test_large_action_runs_in_background(self):
+        """Действие над большим числом строк ставится в очередь задач."""
+        response = self.act(
+            'post', 'delete_authors_content', [self.spam.pk], apply=1
+        )
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'posts.moderation.delete_authors_content')
+        self.assertContains(response, f'Задача #{job.pk}')
+        self.assertTrue(Post.objects.filter(pk=self.spam.pk).exists())
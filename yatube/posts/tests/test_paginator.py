@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import ArchivedPost, Post
+from ..utils import ArchiveFeed, WindowPaginator, cached_count
+
+User = get_user_model()
+
+
+class WindowPaginatorTests(TestCase):
+    def test_elided_page_range(self):
+        """Показываются края и соседи текущей страницы."""
+        paginator = WindowPaginator(range(1000), 10)
+        ellipsis = WindowPaginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.get_elided_page_range(50)),
+            [1, ellipsis, 48, 49, 50, 51, 52, ellipsis, 100]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)),
+            [1, 2, 3, ellipsis, 100]
+        )
+        self.assertEqual(
+            list(WindowPaginator(range(50), 10).get_elided_page_range(3)),
+            [1, 2, 3, 4, 5]
+        )
+
+
+class CachedCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}') for i in range(25)
+        )
+
+    def test_count_cached_until_new_post(self):
+        """COUNT(*) берётся из кэша, пока не появится новый пост."""
+        posts = Post.objects.all()
+        self.assertEqual(cached_count(posts), 25)
+        with self.assertNumQueries(1):
+            self.assertEqual(cached_count(posts), 25)
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertEqual(cached_count(posts), 26)
+
+    def test_count_key_query_skips_joins(self):
+        """MAX(id) для ключа считается по таблице, без JOIN'ов выборки."""
+        posts = Post.objects.visible().select_related('author', 'group')
+        with CaptureQueriesContext(connection) as queries:
+            cached_count(posts)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+        self.assertNotIn('WHERE', queries[0]['sql'])
+
+    def test_feed_corrects_stale_count_after_delete(self):
+        """После удаления страница на стыке с архивом остаётся полной."""
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(
+                id=1000 + i, author=self.user, text=f'Архив {i}',
+                pub_date=timezone.now()
+            )
+            for i in range(20)
+        )
+        hot, cold = Post.objects.all(), ArchivedPost.objects.all()
+        self.assertEqual(ArchiveFeed(hot, cold).count(), 45)
+        Post.objects.filter(pk=Post.objects.order_by('pk')[0].pk).delete()
+        pages = [
+            [(post.is_archived, post.pk)
+             for post in ArchiveFeed(hot, cold)[start:start + 10]]
+            for start in range(0, 50, 10)
+        ]
+        self.assertEqual([len(page) for page in pages], [10, 10, 10, 10, 4])
+        self.assertEqual(len(set(sum(pages, []))), 44)
+
+    def test_page_renders_window(self):
+        """Страница ленты выводит окно ссылок на страницы."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Ещё пост {i}') for i in range(100)
+        )
+        response = Client().get(reverse('posts:index'), {'page': 6})
+        self.assertEqual(
+            response.context['page_obj'].elided_range,
+            [1, '…', 4, 5, 6, 7, 8, '…', 13]
+        )
+        self.assertNotContains(response, '?page=10"')
@@ -0,0 +1,111 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import ActivityBucket, Comment, Group, Post
+from ..trending import current_bucket, trending_ids
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.quiet_post = Post.objects.create(
+            author=cls.user, text='Тихий пост'
+        )
+        cls.hot_post = Post.objects.create(
+            author=cls.user, text='Горячий пост', group=cls.group
+        )
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.hot_post, author=cls.user, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comments_increment_hourly_buckets(self):
+        """Комментарии увеличивают один счётчик текущего часа."""
+        bucket = ActivityBucket.objects.get(
+            kind=ActivityBucket.POST, object_id=TrendingTests.hot_post.pk
+        )
+        self.assertEqual(bucket.bucket, current_bucket())
+        self.assertEqual(bucket.count, 4)
+        self.assertEqual(
+            ActivityBucket.objects.get(
+                kind=ActivityBucket.GROUP, object_id=TrendingTests.group.pk
+            ).count,
+            4
+        )
+
+    def test_comment_by_post_id_counts_group(self):
+        """Комментарий без загруженного поста тоже засчитывается группе."""
+        Comment.objects.create(
+            post_id=TrendingTests.hot_post.pk, author=TrendingTests.user,
+            text='Ещё комментарий'
+        )
+        self.assertEqual(
+            ActivityBucket.objects.get(
+                kind=ActivityBucket.GROUP, object_id=TrendingTests.group.pk
+            ).count,
+            5
+        )
+
+    def test_comment_from_view_does_not_reload_post(self):
+        """Комментарий из формы не перечитывает пост ради группы."""
+        client = Client()
+        client.force_login(TrendingTests.user)
+        with CaptureQueriesContext(connection) as queries:
+            client.post(
+                reverse(
+                    'posts:add_comment', args=(TrendingTests.hot_post.pk,)
+                ),
+                {'text': 'Комментарий из формы'}
+            )
+        post_reads = [
+            query for query in queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "posts_post"' in query['sql']
+        ]
+        self.assertEqual(len(post_reads), 1)
+
+    def test_trending_posts_ordered_by_activity(self):
+        """Посты с большей активностью идут первыми."""
+        self.assertEqual(
+            trending_ids(ActivityBucket.POST, 10),
+            [TrendingTests.hot_post.pk, TrendingTests.quiet_post.pk]
+        )
+
+    def test_trending_page(self):
+        """Страница трендов показывает посты и группы."""
+        response = Client().get(reverse('posts:trending'))
+        self.assertEqual(response.context['posts'][0], TrendingTests.hot_post)
+        self.assertEqual(response.context['groups'], [TrendingTests.group])
+
+    def test_trim_removes_buckets_outside_window(self):
+        """Счётчики старше окна трендов удаляются."""
+        ActivityBucket.objects.create(
+            kind=ActivityBucket.POST,
+            object_id=TrendingTests.quiet_post.pk,
+            bucket=current_bucket() - settings.TRENDING_WINDOW_HOURS,
+            count=100
+        )
+        call_command('trim_activity', stdout=StringIO())
+        self.assertFalse(ActivityBucket.objects.filter(
+            bucket__lt=current_bucket()
+        ).exists())
@@ -7,10 +7,13 @@ from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.paginator import Page
+from django.db import IntegrityError
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
-from ..models import Follow, Group, Post
+from ..follow_cache import get_following_ids
+from ..models import Comment, Follow, Group, Post
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -326,3 +329,140 @@ class PostViewTests(TestCase):
         self.assertNotContains(response, post.text)
         user.delete()
         post.delete()
+
+    def test_following_ids_are_cached(self):
+        """Подписки берутся из кэша и сбрасываются при подписке/отписке."""
+        author = User.objects.create_user(username='another')
+        user = User.objects.get(pk=PostViewTests.user.pk)
+        self.assertNotIn(author.pk, get_following_ids(user))
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', args=(author.username,)
+        ))
+        user = User.objects.get(pk=PostViewTests.user.pk)
+        self.assertIn(author.pk, get_following_ids(user))
+        user = User.objects.get(pk=PostViewTests.user.pk)
+        with self.assertNumQueries(0):
+            self.assertIn(author.pk, get_following_ids(user))
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow', args=(author.username,)
+        ))
+        user = User.objects.get(pk=PostViewTests.user.pk)
+        self.assertNotIn(author.pk, get_following_ids(user))
+
+    def test_repeated_follow_creates_single_row(self):
+        """Повторная подписка не создаёт дубликатов."""
+        author = User.objects.create_user(username='another')
+        for _ in range(2):
+            self.authorized_client.get(reverse(
+                'posts:profile_follow', args=(author.username,)
+            ))
+        self.assertEqual(
+            Follow.objects.filter(
+                user=PostViewTests.user, author=author
+            ).count(),
+            1
+        )
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=PostViewTests.user, author=author)
+
+    def test_follow_and_unfollow_are_single_statements(self):
+        """Подписка и отписка - по одному запросу, кэш подписок сброшен."""
+        author = User.objects.create_user(username='another')
+        user = User.objects.get(pk=PostViewTests.user.pk)
+        self.assertNotIn(author.pk, get_following_ids(user))
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                Follow.objects.follow(user, author)
+        self.assertIn(author.pk, get_following_ids(
+            User.objects.get(pk=user.pk)
+        ))
+        with self.assertNumQueries(1):
+            Follow.objects.unfollow(user, author)
+        self.assertFalse(Follow.objects.filter(author=author).exists())
+        self.assertNotIn(author.pk, get_following_ids(
+            User.objects.get(pk=user.pk)
+        ))
+
+
+# Свой кэш: ключи счётчиков и фрагментов от прошлых тестов совпадают
+# с нашими, потому что id после отката транзакции переиспользуются
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'page-cache-tests',
+}})
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other = Group.objects.create(title='Другая', slug='other')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=PageCacheTests.user,
+            group=PageCacheTests.group,
+            text='Старый текст',
+        )
+        self.pages = (
+            reverse('posts:group_list', args=(PageCacheTests.group.slug,)),
+            reverse('posts:profile', args=(PageCacheTests.user.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+
+    def test_pages_are_cached(self):
+        """Посты на страницах группы, автора и поста берутся из кэша."""
+        for page in self.pages:
+            self.client.get(page)
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        for page in self.pages:
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), 'Старый текст')
+
+    def test_warm_feed_pages_skip_feed_query(self):
+        """Из кэша ленты отдаются без выборки постов, остаётся MAX(id)."""
+        for page in (reverse('posts:index'), *self.pages[:2]):
+            self.client.get(page)
+            with self.subTest(page=page), self.assertNumQueries(1):
+                self.assertContains(self.client.get(page), 'Старый текст')
+
+    def test_post_save_invalidates_pages(self):
+        """Правка поста сбрасывает кэш его страниц."""
+        for page in self.pages:
+            self.client.get(page)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for page in self.pages:
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), 'Новый текст')
+
+    def test_move_to_other_group_invalidates_old_group(self):
+        """Пост, перенесённый в другую группу, пропадает со страницы старой."""
+        old_page, *_ = self.pages
+        self.client.get(old_page)
+        self.post.group = PageCacheTests.other
+        self.post.save(update_fields=['group'])
+        self.assertNotContains(self.client.get(old_page), 'Старый текст')
+
+    def test_comment_invalidates_post_page(self):
+        """Новый комментарий сразу виден на странице поста."""
+        *_, post_page = self.pages
+        self.client.get(post_page)
+        Comment.objects.create(
+            post=self.post, author=PageCacheTests.user, text='Комментарий'
+        )
+        self.assertContains(self.client.get(post_page), 'Комментарий')
+
+    def test_login_keeps_author_page_cache(self):
+        """Вход автора не сбрасывает кэш, смена имени сбрасывает."""
+        _, profile_page, _ = self.pages
+        self.client.get(profile_page)
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        user = PageCacheTests.user
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        self.assertContains(self.client.get(profile_page), 'Старый текст')
+        user.first_name = 'Лев'
+        user.save(update_fields=['first_name'])
+        self.assertContains(self.client.get(profile_page), 'Без сигналов')
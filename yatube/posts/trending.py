@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import ActivityBucket
+
+BUCKET_SECONDS = 60 * 60
+
+
+def current_bucket():
+    return int(time.time() // BUCKET_SECONDS)
+
+
+def record_activity(kind, object_id, amount=1):
+    """Атомарно увеличивает счётчик текущего часа."""
+    bucket = current_bucket()
+    counter = ActivityBucket.objects.filter(
+        kind=kind, object_id=object_id, bucket=bucket
+    )
+    if counter.update(count=F('count') + amount):
+        return
+    try:
+        with transaction.atomic():
+            ActivityBucket.objects.create(
+                kind=kind, object_id=object_id, bucket=bucket, count=amount
+            )
+    except IntegrityError:
+        counter.update(count=F('count') + amount)
+
+
+def trending_ids(kind, limit):
+    """
+    id самых активных объектов за TRENDING_WINDOW_HOURS часов.
+    Свежие часы весят больше: вес корзины растёт от 1 до размера окна.
+    """
+    start = current_bucket() - settings.TRENDING_WINDOW_HOURS + 1
+    return list(ActivityBucket.objects.filter(
+        kind=kind, bucket__gte=start
+    ).values('object_id').annotate(
+        score=Sum(F('count') * (F('bucket') - start + 1))
+    ).order_by('-score').values_list('object_id', flat=True)[:limit])
+
+
+def ordered_by_ids(queryset, ids):
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
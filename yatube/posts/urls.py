@@ -24,6 +24,10 @@ urlpatterns = [
         name='add_comment'
     ),
     path('follow/', views.follow_index, name='follow_index'),
+    # Популярное за последние часы
+    path('trending/', views.trending, name='trending'),
+    # Рейтинг авторов по графу подписок
+    path('authors/top/', views.top_authors, name='top_authors'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,8 +1,233 @@
+from collections.abc import Sequence
+from hashlib import md5
+
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
 from django.core.paginator import Paginator
+from django.db.models import Max
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
+
+from core.object_cache import TwoTierCache
+
+from .models import ArchivedPost, Group, Post
+
+User = get_user_model()
+
+ARCHIVE_VERSION_KEY = 'posts:archive_version'
+ARCHIVE_COUNT_TIMEOUT = 60 * 10
+
+
+# Теги кэша страниц (core.tagged_cache), их сбрасывают сигналы моделей
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def author_tag(author_id):
+    return f'author:{author_id}'
+
+
+def group_tag(slug):
+    return f'group:{slug}'
+
 
+def group_tags(*group_ids):
+    group_ids = {pk for pk in group_ids if pk}
+    if not group_ids:
+        return []
+    return [
+        group_tag(slug) for slug in Group.objects.filter(
+            pk__in=group_ids
+        ).values_list('slug', flat=True)
+    ]
 
-def get_page_obj(request, list):
-    paginator = Paginator(list, settings.ROW_LIMIT)
+
+class WindowPaginator(Paginator):
+    """Paginator, который показывает не все страницы, а окно вокруг текущей."""
+    ELLIPSIS = '…'
+
+    def get_elided_page_range(self, number, on_each_side=2, on_ends=1):
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который берёт число объектов из cached_count."""
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list)
+
+
+def get_page_obj(request, post_list):
+    paginator = WindowPaginator(post_list, settings.ROW_LIMIT)
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    page_obj = paginator.get_page(page_number)
+    page_obj.elided_range = list(
+        paginator.get_elided_page_range(page_obj.number)
+    )
+    return page_obj
+
+
+def _query_key(queryset):
+    return md5(str(queryset.query).encode()).hexdigest()
+
+
+def cached_count(queryset, refresh=False):
+    """
+    COUNT(*) из кэша. В ключе MAX(id) всей таблицы: его отдаёт индекс
+    первичного ключа без JOIN'ов и фильтров выборки, новый пост сразу
+    даёт новый ключ, а удаления видны не позже чем через
+    PAGE_COUNT_TIMEOUT. refresh=True пересчитывает значение в кэше.
+    """
+    try:
+        sql = _query_key(queryset)
+    except EmptyResultSet:
+        return 0
+    last = queryset.model._base_manager.using(queryset.db).aggregate(
+        last=Max('pk')
+    )['last']
+    if last is None:
+        return 0
+    key = f'posts:count:{sql}:{last}'
+    if refresh:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGE_COUNT_TIMEOUT)
+        return count
+    return cache.get_or_set(key, queryset.count, settings.PAGE_COUNT_TIMEOUT)
+
+
+def archive_count(queryset):
+    # Архив меняет только archive_posts, она же сбрасывает версию
+    try:
+        sql = _query_key(queryset)
+    except EmptyResultSet:
+        return 0
+    version = cache.get(ARCHIVE_VERSION_KEY, 0)
+    return cache.get_or_set(
+        f'posts:archive_count:{version}:{sql}', queryset.count,
+        ARCHIVE_COUNT_TIMEOUT
+    )
+
+
+class LazySlice(Sequence):
+    """Список, который строит load() при первом обращении."""
+
+    def __init__(self, load):
+        self._load = load
+
+    @cached_property
+    def _items(self):
+        return self._load()
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ArchiveFeed:
+    """
+    Лента из горячих постов, за которыми продолжается архив.
+    Архив читается, только когда срез выходит за горячую часть.
+    """
+
+    def __init__(self, hot, cold):
+        self.hot = hot
+        self.cold = cold
+        self._hot_count = None
+
+    @property
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = cached_count(self.hot)
+        return self._hot_count
+
+    def count(self):
+        return self.hot_count + archive_count(self.cold)
+
+    def __getitem__(self, key):
+        # Страница читается при первом обращении к постам: если её посты
+        # уже есть во фрагменте кэша, запроса ленты не будет
+        return LazySlice(lambda: self._slice(key.start or 0, key.stop))
+
+    def _slice(self, start, stop):
+        posts = []
+        if start < self.hot_count:
+            posts = list(self.hot[start:stop])
+            if stop is None or len(posts) < stop - start:
+                # Горячие посты кончились раньше срока: счётчик
+                # из кэша устарел после удаления, пересчитываем его
+                self._hot_count = cached_count(self.hot, refresh=True)
+        if stop is None or stop > self.hot_count:
+            posts += list(self.cold[
+                max(start - self.hot_count, 0):
+                None if stop is None else stop - self.hot_count
+            ])
+        return posts
+
+
+# Группы и авторы по слагу и имени: меняются редко, а нужны на каждой
+# странице группы и профиля. Сбрасываются сигналами моделей.
+groups_by_slug = TwoTierCache(
+    'group', lambda slug: Group.objects.filter(
+        slug=slug, is_deleted=False
+    ).first()
+)
+authors_by_username = TwoTierCache(
+    'author', lambda username: User.objects.filter(
+        username=username, deletion=None
+    ).first()
+)
+
+
+def get_group_or_404(slug):
+    group = groups_by_slug.get(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    return group
+
+
+def get_author_or_404(username):
+    author = authors_by_username.get(username)
+    if author is None:
+        raise Http404('Пользователь не найден')
+    return author
+
+
+def get_post_or_404(post_id):
+    post = Post.objects.visible().select_related('author', 'group').filter(
+        pk=post_id
+    ).first()
+    if post is None:
+        post = get_object_or_404(
+            ArchivedPost.objects.visible().select_related('author', 'group'),
+            pk=post_id
+        )
+    return post
+
+
+def can_view_image(request, name):
+    """Картинку скрытого поста (posts.deletion) видят только сотрудники."""
+    return request.user.is_staff or any(
+        model.objects.visible().filter(image=name).exists()
+        for model in (Post, ArchivedPost)
+    )
@@ -1,16 +1,25 @@
-from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.cache import cache_page
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-from .utils import get_page_obj
+from core.ratelimit import ratelimit
 
-User = get_user_model()
+from .follow_cache import get_following_ids
+from .forms import CommentForm, PostForm
+from .models import (ActivityBucket, ArchivedPost, AuthorRank, Comment,
+                     Follow, Group, Post, SuggestedAuthor)
+from .trending import ordered_by_ids, trending_ids
+from .utils import (ArchiveFeed, author_tag, get_author_or_404,
+                    get_group_or_404, get_page_obj, get_post_or_404,
+                    group_tag, post_tag)
 
 
 def index(request):
-    post_list = Post.objects.select_related('group').all()
+    post_list = ArchiveFeed(
+        Post.objects.visible().select_related('author', 'group'),
+        ArchivedPost.objects.visible().select_related('author', 'group')
+    )
     context = {
         'page_obj': get_page_obj(request, post_list),
     }
@@ -18,45 +27,56 @@ def index(request):
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.post_group.all()
+    group = get_group_or_404(slug)
+    post_list = ArchiveFeed(
+        group.post_group.visible().select_related('author'),
+        group.archived_posts.visible().select_related('author')
+    )
     context = {
         'group': group,
         'page_obj': get_page_obj(request, post_list),
+        'cache_tags': [group_tag(group.slug)],
     }
     return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=author
-    ).exists()
+    author = get_author_or_404(username)
+    post_list = ArchiveFeed(
+        author.posts.visible().select_related('group'),
+        author.archived_posts.visible().select_related('group')
+    )
+    following = author.pk in get_following_ids(request.user)
     context = {
         'author': author,
         'count': post_list.count(),
         'page_obj': get_page_obj(request, post_list),
-        'following': following
+        'following': following,
+        'cache_tags': [author_tag(author.pk)],
     }
     return render(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_post_or_404(post_id)
     context = {
         'post': post,
         'title': post.text[:30],
         'author': post.author,
-        'count': Post.objects.filter(author=post.author).count(),
+        'count': ArchiveFeed(
+            post.author.posts.all(), post.author.archived_posts.all()
+        ).count(),
         'form': CommentForm(),
-        'comments': post.comments.all()
+        'comments': Comment.objects.filter(
+            post_id=post.pk
+        ).prefetch_related('author'),
+        'cache_tags': [post_tag(post.pk)],
     }
     return render(request, 'posts/post_detail.html', context)
 
 
 @login_required
+@ratelimit('post_create')
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
@@ -77,16 +97,29 @@ def post_edit(request, post_id):
         files=request.FILES or None,
         instance=post
     )
-    if not form.is_valid():
-        return render(request, 'posts/create_post.html',
-                      {'form': form, 'is_edit': True})
-    post.text = form.cleaned_data['text']
-    post.group = form.cleaned_data['group']
-    post.save()
-    return redirect('posts:post_detail', post_id=post_id)
+    version = post.version
+    if form.is_valid():
+        # Форма уже перенесла данные в post, пишем только изменённые поля,
+        # а правку без изменений не сохраняем вовсе
+        expected = request.POST.get('version', '')
+        expected = int(expected) if expected.isdigit() else version
+        if not form.has_changed() or post.save_changes(
+            form.changed_data, expected
+        ):
+            return redirect('posts:post_detail', post_id=post_id)
+        form.add_error(
+            None, 'Пост уже изменён в другом окне. Проверьте текст и '
+            'сохраните ещё раз, чтобы заменить ту правку.'
+        )
+        version = Post.objects.values_list('version', flat=True).get(
+            pk=post_id
+        )
+    return render(request, 'posts/create_post.html',
+                  {'form': form, 'is_edit': True, 'version': version})
 
 
 @login_required
+@ratelimit('add_comment')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -100,35 +133,63 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.select_related('group').filter(
-        author__following__user=request.user
+    # Follow может лежать в другой базе, поэтому вместо JOIN
+    # берём id авторов из кэша подписок, затем их посты.
+    authors = get_following_ids(request.user)
+    post_list = ArchiveFeed(
+        Post.objects.visible().filter(
+            author_id__in=authors
+        ).select_related('author', 'group'),
+        ArchivedPost.objects.visible().filter(
+            author_id__in=authors
+        ).select_related('author', 'group')
     )
     context = {
         'page_obj': get_page_obj(request, post_list),
+        'suggested_authors': SuggestedAuthor.objects.filter(
+            user=request.user
+        ).select_related('author')[:settings.SUGGESTED_AUTHORS_LIMIT],
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@ratelimit('follow', methods=('GET', 'POST'))
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    if Follow.objects.filter(
-        user=request.user,
-        author=author
-    ).exists() or author == request.user:
-        return redirect('posts:profile', username=username)
-    Follow.objects.create(
-        user=request.user,
-        author=author
-    )
+    author = get_author_or_404(username)
+    if author != request.user:
+        Follow.objects.follow(request.user, author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    Follow.objects.filter(
-        user=request.user,
-        author=author
-    ).delete()
+    author = get_author_or_404(username)
+    Follow.objects.unfollow(request.user, author)
     return redirect('posts:profile', username=username)
+
+
+@cache_page(60 * 15)
+def top_authors(request):
+    context = {
+        'ranks': AuthorRank.objects.select_related(
+            'author'
+        )[:settings.TOP_AUTHORS_LIMIT],
+    }
+    return render(request, 'posts/top_authors.html', context)
+
+
+@cache_page(60)
+def trending(request):
+    limit = settings.TRENDING_LIMIT
+    context = {
+        'posts': ordered_by_ids(
+            Post.objects.visible().select_related('author', 'group'),
+            trending_ids(ActivityBucket.POST, limit)
+        ),
+        'groups': ordered_by_ids(
+            Group.objects.filter(is_deleted=False),
+            trending_ids(ActivityBucket.GROUP, limit)
+        ),
+    }
+    return render(request, 'posts/trending.html', context)
@@ -0,0 +1,18 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+
+from posts.admin import BackgroundDeletionMixin
+from posts.deletion import delete_user_later
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class UserAdmin(BackgroundDeletionMixin, BaseUserAdmin):
+    delete_later = staticmethod(delete_user_later)
+    cascade_models = (Post, Comment, Follow)
+
+
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
@@ -46,6 +46,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # сжатие должно видеть ответ последним, поэтому стоит выше остальных
+    'core.middleware.StreamingGZipMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
+    'core.middleware.PreloadLinkMiddleware',
+    'core.middleware.HtmlMinifyMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -90,6 +95,54 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения. Локально это копии db.sqlite3,
+# которые обновляет команда sync_replicas.
+DATABASE_REPLICAS = [
+    f'replica{i}' for i in range(1, int(os.getenv('DB_REPLICAS', 0)) + 1)
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db_{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Таблицы с частой записью можно вынести в отдельные файлы SQLite,
+# чтобы запись в них не ждала блокировку основной базы.
+DATABASE_TABLE_ROUTES = {}
+if os.getenv('DB_SPLIT'):
+    DATABASE_TABLE_ROUTES = {
+        'sessions.session': 'sessions',
+        'posts.follow': 'social',
+        'posts.comment': 'comments',
+    }
+for alias in set(DATABASE_TABLE_ROUTES.values()):
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db_{alias}.sqlite3'),
+    }
+
+DATABASE_ROUTERS = [
+    'core.routers.SplitTablesRouter',
+    'core.routers.PrimaryReplicaRouter',
+]
+
+# PRAGMA, которые выполняются при открытии каждого соединения с SQLite.
+# WAL позволяет читать во время записи, busy_timeout ждёт блокировку
+# вместо ошибки "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# После записи клиент столько секунд читает только из основной базы
+REPLICA_PIN_COOKIE = 'pin_primary'
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -128,18 +181,152 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# Имена с хэшем содержимого и сжатые копии .gz (collectstatic)
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# Без nginx статику отдаёт core.views.static_file; файлы с хэшем в имени
+# кэшируются браузером на STATIC_MAX_AGE секунд без перепроверки
+SERVE_STATIC = not DEBUG
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+# Удалять из HTML-ответов комментарии и лишние пробелы
+HTML_MINIFY = True
+# Критичные файлы, которые PreloadLinkMiddleware отдаёт в заголовке Link
+PRELOAD_STATIC = [('vendor/bootstrap/css/bootstrap.min.css', 'style')]
+
+# Кэш по умолчанию - память процесса. При нескольких процессах (gunicorn,
+# run_workers) сбросы кэша видны другим только через общий кэш:
+# CACHE_BACKEND=django.core.cache.backends.memcached.PyLibMCCache
+# CACHE_LOCATION=127.0.0.1:11211
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Сессии читаются из кэша с записью в базу; SESSION_ENGINE=
+# django.contrib.sessions.backends.signed_cookies хранит их в cookie
+SESSION_ENGINE = os.getenv(
+    'SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db'
+)
+
+# Пользователь сессии берётся из кэша на USER_CACHE_TIMEOUT секунд
+AUTHENTICATION_BACKENDS = [
+    'core.auth.CachedModelBackend',
+    # сессии, открытые до включения кэша
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_TIMEOUT = 5 * 60
+# Обратные связи пользователя, при которых вход запрещён: пользователь
+# ждёт удаления (posts.UserDeletion)
+AUTH_BLOCKING_RELATIONS = ['deletion']
+# Группы и авторы по слагу и имени (core.object_cache): сколько объектов
+# держит каждый процесс и сколько секунд они хранятся в общем кэше
+OBJECT_CACHE_SIZE = 1000
+OBJECT_CACHE_TIMEOUT = 60 * 60
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
+# Письма складываются в таблицу OutboxMessage и отправляются
+# фоновой задачей через OUTBOX_EMAIL_BACKEND пачками по OUTBOX_BATCH_SIZE
+EMAIL_BACKEND = 'core.mail.OutboxBackend'
 #  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Картинки постов раскладываются по MEDIA_SHARD_DEPTH уровням подкаталогов,
+# старые файлы переносит команда shard_media
+DEFAULT_FILE_STORAGE = 'core.storage.ShardedFileSystemStorage'
+MEDIA_SHARD_DEPTH = 2
+# Загрузки отдаёт фронтовый сервер по заголовку от core.views.media_file:
+# 'x-accel-redirect' (nginx, internal location MEDIA_ACCEL_LOCATION
+# с alias на MEDIA_ROOT) или 'x-sendfile' (Apache, lighttpd).
+# Пусто - файлы отдаёт Django, только для разработки.
+MEDIA_ACCEL = os.getenv('MEDIA_ACCEL', '')
+MEDIA_ACCEL_LOCATION = '/protected-media/'
+MEDIA_MAX_AGE = 7 * 24 * 60 * 60
+# Префикс пути -> функция (request, name), разрешающая отдать файл
+MEDIA_ACCESS_CHECKS = {'posts/': 'posts.utils.can_view_image'}
 
 ROW_LIMIT = 10
+# Сколько секунд число постов в ленте может не учитывать удаления
+PAGE_COUNT_TIMEOUT = 5 * 60
+# Кэш фрагментов страниц (core.tagged_cache.cached): сколько секунд после
+# истечения отдавать устаревшую копию, пока её пересчитывает один запрос,
+# на сколько берётся блокировка пересчёта и сколько её ждать при промахе
+CACHE_STALE_TIMEOUT = 60
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_WAIT = 2
+# Чем больше, тем раньше до истечения начинается пересчёт
+CACHE_EARLY_BETA = 1.0
+
+# Посты старше этого возраста команда archive_posts переносит в архив
+POST_ARCHIVE_AGE_DAYS = 30
+
+# Сколько рекомендаций авторов хранить и показывать пользователю
+SUGGESTED_AUTHORS_LIMIT = 10
+
+# Сколько авторов показывать на странице рейтинга
+TOP_AUTHORS_LIMIT = 50
+
+# Окно трендов в часах и число популярных постов и групп на странице
+TRENDING_WINDOW_HOURS = 24
+TRENDING_LIMIT = 10
+
+# Ограничения частоты запросов на запись: ёмкость корзины жетонов
+# и время её полного пополнения (s, m, h, d)
+RATELIMITS = {
+    'post_create': {'user': '10/m', 'ip': '30/m'},
+    'add_comment': {'user': '20/m', 'ip': '60/m'},
+    'follow': {'user': '60/m', 'ip': '120/m'},
+    'signup': {'ip': '5/h'},
+}
+# Заголовок из request.META с адресом клиента, который выставляет
+# доверенный фронтовый сервер, например 'HTTP_X_FORWARDED_FOR'.
+# Пусто - адрес берётся из REMOTE_ADDR.
+RATELIMIT_IP_HEADER = os.getenv('RATELIMIT_IP_HEADER', '')
+
+# Очередь фоновых задач (run_workers): число попыток, задержка первого
+# повтора и её предел в секундах, через сколько секунд выполняющаяся
+# задача считается потерянной и сколько часов хранить выполненные
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX_DELAY = 60 * 60
+JOB_TIMEOUT = 10 * 60
+JOB_KEEP_DONE_HOURS = 24
+
+# Массовые действия модерации, затрагивающие больше строк,
+# выполняются в фоне очередью задач
+MODERATION_SYNC_LIMIT = 5000
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.ratelimit': {
+            'handlers': ['console'],
+            'level': os.getenv('RATELIMIT_LOG_LEVEL', 'INFO'),
+        },
+        'core.management.commands.run_workers': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'posts.moderation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}